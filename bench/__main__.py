@@ -0,0 +1,165 @@
+"""Load test of the API against a local ElasticSearch and Redis.
+
+Seed ElasticSearch with a generated corpus, then replay the request mix
+and save the report as a baseline to compare later runs against:
+
+    python -m bench seed --elastic http://localhost:9200
+    python -m bench run --start-app --output baseline.json
+    python -m bench run --start-app --compare baseline.json
+
+With --start-app the API is started by uvicorn with settings from the
+environment and .env, so they must point to the same ElasticSearch.
+Rate limiting is turned off for it, since all load comes from one client.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from bench.corpus import Corpus
+from bench.load import Scenarios, run_load
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLUMNS = (
+    "requests", "rps", "errors", "p50_ms", "p95_ms", "p99_ms",
+    "cache_hit_ratio",
+)
+
+
+def parse() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--movies", type=int, default=10000)
+    parser.add_argument("--persons", type=int, default=5000)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="load corpus to ElasticSearch")
+    seed.add_argument("--elastic", default="http://localhost:9200")
+
+    run = commands.add_parser("run", help="replay request mix")
+    run.add_argument("--url", default="http://127.0.0.1:8001")
+    run.add_argument(
+        "--start-app",
+        action="store_true",
+        help="start src.main:app on the port of --url",
+    )
+    run.add_argument(
+        "--flush-cache",
+        metavar="REDIS_URL",
+        help="remove cached responses before the run",
+    )
+    run.add_argument("--concurrency", type=int, default=32)
+    run.add_argument("--duration", type=float, default=30)
+    run.add_argument("--warmup", type=float, default=5)
+    run.add_argument("--output", help="save report as JSON")
+    run.add_argument("--compare", help="report saved by an earlier run")
+    return parser.parse_args()
+
+
+@contextmanager
+def app_process(url: str):
+    """Run the API in a uvicorn process while in context."""
+    parsed = urlparse(url)
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "src.main:app",
+            "--host", parsed.hostname, "--port", str(parsed.port),
+            "--no-access-log", "--log-level", "warning",
+        ],
+        cwd=ROOT_DIR,
+        env={**os.environ, "RATE_LIMIT_ENABLED": "false"},
+    )
+    try:
+        yield process
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def wait_ready(url: str, timeout: float = 60):
+    """Wait until the API reports it's ready to take traffic."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/ready") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"API at {url} is not ready after {timeout}s")
+
+
+async def flush_cache(redis_url: str):
+    """Remove responses cached by the API."""
+    import aioredis
+
+    redis = aioredis.from_url(redis_url)
+    try:
+        async for key in redis.scan_iter(match="fastapi-cache:*"):
+            await redis.delete(key)
+    finally:
+        await redis.close()
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    print(f"{'route':<16}" + "".join(f"{column:>17}" for column in COLUMNS))
+    for route, summary in report.items():
+        cells = []
+        for column in COLUMNS:
+            value = summary.get(column, "-")
+            previous = (baseline or {}).get(route, {}).get(column)
+            if previous and isinstance(value, (int, float)):
+                value = f"{value} ({(value - previous) / previous:+.0%})"
+            cells.append(f"{value:>17}")
+        print(f"{route:<16}" + "".join(cells))
+
+
+async def main():
+    args = parse()
+    corpus = Corpus.generate(args.seed, args.movies, args.persons)
+    if args.command == "seed":
+        from elasticsearch import AsyncElasticsearch
+
+        from bench.seed import seed
+
+        elastic = AsyncElasticsearch(hosts=[args.elastic])
+        try:
+            await seed(elastic, corpus)
+        finally:
+            await elastic.close()
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    if args.flush_cache:
+        await flush_cache(args.flush_cache)
+    with app_process(args.url) if args.start_app else nullcontext():
+        await wait_ready(args.url)
+        report = await run_load(
+            args.url,
+            Scenarios(corpus),
+            args.concurrency,
+            args.duration,
+            args.warmup,
+            args.seed,
+        )
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+import random
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+WORDS = (
+    "star", "war", "love", "night", "city", "dark", "king", "last", "black",
+    "dream", "world", "secret", "lost", "river", "fire", "ghost", "summer",
+    "winter", "blood", "heart", "empire", "shadow", "house", "road", "sea",
+    "storm", "silent", "golden", "wild", "stone", "moon", "island", "game",
+    "hunter", "queen", "return", "journey", "story", "little", "red", "iron",
+    "glass", "space", "time", "mirror", "garden", "street", "code", "edge",
+)
+FIRST_NAMES = (
+    "John", "Anna", "Peter", "Maria", "James", "Olga", "Robert", "Emma",
+    "Michael", "Sofia", "David", "Alice", "Thomas", "Irina", "George",
+    "Laura", "Daniel", "Nina", "Paul", "Clara",
+)
+LAST_NAMES = (
+    "Smith", "Ivanov", "Brown", "Petrova", "Wilson", "Taylor", "Moore",
+    "Sokolov", "Clark", "Lewis", "Walker", "Hall", "Young", "Allen", "King",
+    "Wright", "Scott", "Green", "Baker", "Adams",
+)
+GENRE_NAMES = (
+    "Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "History", "Horror", "Music", "Mystery",
+    "Romance", "Sci-Fi", "Sport", "Thriller", "War", "Western", "Biography",
+)
+ROLES = ("actor", "writer", "director")
+# Weights of shared directors, actors and genres like in ETL
+SIMILARITY_BOOSTS = (("directors", 3), ("actors", 2), ("genres", 1))
+SIMILAR_MOVIES_COUNT = 10
+
+
+@dataclass
+class Corpus:
+    """Documents of movies, persons and genres in the format of ETL."""
+
+    movies: list[dict] = field(default_factory=list)
+    persons: list[dict] = field(default_factory=list)
+    genres: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def generate(cls, seed: int, movies: int, persons: int) -> 'Corpus':
+        """Generate the same corpus for the same arguments."""
+        rng = random.Random(seed)
+        corpus = cls()
+        corpus.genres = [
+            {"id": _make_id(rng), "name": name, "description": _text(rng, 8)}
+            for name in GENRE_NAMES
+        ]
+        corpus.persons = [_make_person(rng) for _ in range(persons)]
+        for _ in range(movies):
+            corpus.movies.append(
+                _make_movie(rng, corpus.genres, corpus.persons)
+            )
+        _link_similar_movies(corpus.movies, SIMILAR_MOVIES_COUNT)
+        return corpus
+
+    def documents(self):
+        """Iterate over (index, document) pairs to load."""
+        for index, docs in (
+            ("genres", self.genres),
+            ("persons", self.persons),
+            ("movies", self.movies),
+        ):
+            for doc in docs:
+                yield index, doc
+
+
+def _make_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _make_person(rng: random.Random) -> dict:
+    full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    name_parts = full_name.split()
+    return {
+        "id": _make_id(rng),
+        "full_name": full_name,
+        "birth_date": (
+            date(1940, 1, 1) + timedelta(days=rng.randrange(60 * 365))
+        ).isoformat(),
+        "related_movies": [],
+        "full_name_suggest": {
+            "input": [
+                " ".join(name_parts[i:]) for i in range(len(name_parts))
+            ],
+        },
+    }
+
+
+def _make_movie(
+        rng: random.Random, genres: list[dict], persons: list[dict]
+) -> dict:
+    movie_id = _make_id(rng)
+    title = _text(rng, rng.randint(1, 4)).title()
+    imdb_rating = round(rng.uniform(1, 10), 1)
+    movie = {
+        "id": movie_id,
+        "imdb_rating": imdb_rating,
+        "title": title,
+        "description": _text(rng, rng.randint(10, 30)),
+        "genres": [
+            {"id": genre["id"], "name": genre["name"]}
+            for genre in rng.sample(genres, rng.randint(1, 3))
+        ],
+        "title_suggest": {"input": [title], "weight": int(imdb_rating * 10)},
+    }
+    for role, count in zip(ROLES, (rng.randint(2, 8), 1, 1)):
+        members = rng.sample(persons, count)
+        movie[f"{role}s"] = [
+            {"id": person["id"], "full_name": person["full_name"]}
+            for person in members
+        ]
+        for person in members:
+            person["related_movies"].append({"id": movie_id, "role": role})
+    movie["actors_names"] = ", ".join(
+        actor["full_name"] for actor in movie["actors"]
+    )
+    movie["writers_names"] = ", ".join(
+        writer["full_name"] for writer in movie["writers"]
+    )
+    return movie
+
+
+def _link_similar_movies(movies: list[dict], count: int) -> None:
+    """Set `similar_ids` of movies like ETL does, approximately.
+
+    Candidates are movies sharing a person and the best rated movies of
+    shared genres, so the corpus is linked without comparing all pairs.
+    """
+    by_entity = defaultdict(list)
+    for movie in movies:
+        for path, _ in SIMILARITY_BOOSTS:
+            for entity in movie[path]:
+                by_entity[path, entity["id"]].append(movie)
+    for key, members in by_entity.items():
+        if key[0] == "genres":
+            members.sort(key=lambda member: -member["imdb_rating"])
+            del members[count * 2:]
+    for movie in movies:
+        scores = Counter()
+        for path, boost in SIMILARITY_BOOSTS:
+            for entity in movie[path]:
+                for other in by_entity[path, entity["id"]]:
+                    if other is not movie:
+                        scores[other["id"], other["imdb_rating"]] += boost
+        ranked = sorted(
+            scores.items(), key=lambda item: (-item[1], -item[0][1])
+        )
+        movie["similar_ids"] = [
+            movie_id for (movie_id, _), _ in ranked[:count]
+        ]
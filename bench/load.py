@@ -0,0 +1,180 @@
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Callable
+from urllib.parse import quote
+
+import aiohttp
+
+from bench.corpus import WORDS, Corpus
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+
+class Picker:
+    """Pick corpus items with Zipf-like popularity, as real traffic does."""
+
+    def __init__(self, items: list, exponent: float = 1.0):
+        self.items = items
+        weights = [1 / (rank + 1) ** exponent for rank in range(len(items))]
+        self.cum_weights = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            self.cum_weights.append(total)
+
+    def pick(self, rng: random.Random):
+        return rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+
+class Scenarios:
+    """Paths of API requests of every kind built from the corpus."""
+
+    def __init__(self, corpus: Corpus):
+        self.movies = Picker([movie["id"] for movie in corpus.movies])
+        self.persons = Picker([person["id"] for person in corpus.persons])
+        self.names = Picker(
+            sorted({person["full_name"] for person in corpus.persons})
+        )
+        self.genres = Picker([genre["id"] for genre in corpus.genres])
+        self.words = Picker(list(WORDS))
+        self.pages = Picker(list(range(1, 11)), exponent=1.5)
+
+    def movie_details(self, rng: random.Random) -> str:
+        return f"/api/v1/movies/{self.movies.pick(rng)}"
+
+    def similar_movies(self, rng: random.Random) -> str:
+        return f"/api/v1/movies/{self.movies.pick(rng)}/similar"
+
+    def movies_list(self, rng: random.Random) -> str:
+        path = (
+            f"/api/v1/movies?page={self.pages.pick(rng)}"
+            f"&sort={rng.choice(('imdb_rating', '-imdb_rating'))}"
+        )
+        if rng.random() < 0.3:
+            path += f"&genres={self.genres.pick(rng)}"
+        return path
+
+    def movies_search(self, rng: random.Random) -> str:
+        return f"/api/v1/movies?search={self.words.pick(rng)}"
+
+    def person_details(self, rng: random.Random) -> str:
+        return f"/api/v1/persons/{self.persons.pick(rng)}"
+
+    def person_search(self, rng: random.Random) -> str:
+        return f"/api/v1/persons/?search={quote(self.names.pick(rng))}"
+
+    def person_movies(self, rng: random.Random) -> str:
+        return f"/api/v1/persons/{self.persons.pick(rng)}/movies/"
+
+    def genres_list(self, rng: random.Random) -> str:
+        return "/api/v1/genres/"
+
+    def suggest(self, rng: random.Random) -> str:
+        word = self.words.pick(rng)
+        return f"/api/v1/suggest?prefix={word[:rng.randint(1, len(word))]}"
+
+
+# Weights of request kinds in the replayed mix
+MIX = {
+    "movie_details": 25,
+    "similar_movies": 5,
+    "movies_list": 20,
+    "movies_search": 10,
+    "person_details": 10,
+    "person_search": 5,
+    "person_movies": 10,
+    "genres_list": 5,
+    "suggest": 10,
+}
+
+
+@dataclass
+class RouteStats:
+    """Latencies and results of requests of one kind."""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    cache: Counter = field(default_factory=Counter)
+
+    def summary(self, duration: float) -> dict:
+        latencies = sorted(self.latencies)
+        summary = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / duration, 1),
+            "errors": self.errors,
+        }
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            for name, index in (("p50", 49), ("p95", 94), ("p99", 98)):
+                summary[f"{name}_ms"] = round(percentiles[index] * 1000, 2)
+        cached = sum(self.cache.values())
+        if cached:
+            summary["cache_hit_ratio"] = round(
+                self.cache["hit"] / cached, 3
+            )
+        return summary
+
+
+async def run_load(
+        base_url: str,
+        scenarios: Scenarios,
+        concurrency: int,
+        duration: float,
+        warmup: float = 0,
+        seed: int = 0,
+) -> dict:
+    """Replay the weighted mix of requests at fixed concurrency.
+
+    Requests of the warmup period are sent but not recorded.
+    """
+    kinds = list(MIX)
+    weights = [MIX[kind] for kind in kinds]
+    stats: dict[str, RouteStats] = defaultdict(RouteStats)
+    start = time.perf_counter()
+    record_from = start + warmup
+    deadline = record_from + duration
+
+    async def worker(session: aiohttp.ClientSession, rng: random.Random):
+        while True:
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            kind = rng.choices(kinds, weights=weights)[0]
+            make_path: Callable = getattr(scenarios, kind)
+            try:
+                async with session.get(base_url + make_path(rng)) as resp:
+                    await resp.read()
+                    status = resp.status
+                    cache_status = resp.headers.get(CACHE_STATUS_HEADER)
+            except aiohttp.ClientError:
+                status, cache_status = None, None
+            if started < record_from:
+                continue
+            route_stats = stats[kind]
+            route_stats.latencies.append(time.perf_counter() - started)
+            if status is None or status >= 400:
+                route_stats.errors += 1
+            if cache_status:
+                route_stats.cache[cache_status] += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(
+            *(
+                worker(session, random.Random(seed + number))
+                for number in range(concurrency)
+            )
+        )
+
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies += route_stats.latencies
+        total.errors += route_stats.errors
+        total.cache += route_stats.cache
+    report = {kind: stats[kind].summary(duration) for kind in sorted(stats)}
+    report["total"] = total.summary(duration)
+    return report
@@ -0,0 +1,32 @@
+import json
+import os
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+
+from bench.corpus import Corpus
+
+INDEXES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "etl",
+    "elastic_indexes",
+)
+INDEXES = ("genres", "persons", "movies")
+
+
+async def seed(elastic: AsyncElasticsearch, corpus: Corpus):
+    """Recreate indices by definitions of ETL and load the corpus."""
+    for index in INDEXES:
+        with open(os.path.join(INDEXES_DIR, f"{index}.json")) as index_file:
+            body = json.load(index_file)
+        await elastic.indices.delete(index=index, ignore=404)
+        await elastic.indices.create(index=index, body=body)
+    await async_bulk(
+        elastic,
+        (
+            {"_index": index, "_id": doc["id"], "_source": doc}
+            for index, doc in corpus.documents()
+        ),
+        chunk_size=1000,
+    )
+    await elastic.indices.refresh(index=",".join(INDEXES))
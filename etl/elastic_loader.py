@@ -1,19 +1,98 @@
+import json
+import os
+
 import backoff
 from elasticsearch import Elasticsearch, exceptions
 from loguru import logger
 
+from transform_entities import SIMILARITY_BOOSTS, Movie
+
+INDEXES_DIR = os.path.join(os.path.dirname(__file__), 'elastic_indexes')
+
+
+def ensure_index(es, index):
+    """Create index by its definition in elastic_indexes if it's missing.
+
+    Definition of an existing index is not changed, changed settings
+    apply only after the index is recreated and reloaded.
+    Returns whether the index was created.
+    """
+    if es.indices.exists(index):
+        return False
+    with open(os.path.join(INDEXES_DIR, f'{index}.json')) as index_file:
+        body = json.load(index_file)
+    try:
+        es.indices.create(index=index, body=body)
+    except exceptions.RequestError as e:
+        # Another loader may create the index at the same time, any other
+        # error must stop loading, or bulk would create the index with
+        # dynamic mapping
+        if e.error == 'resource_already_exists_exception':
+            return False
+        raise
+    logger.info(f'Index {index} created in ElasticSearch')
+    return True
+
 
 @backoff.on_exception(
     backoff.expo, exceptions.ConnectionError,
     max_time=60, logger=logger,
 )
 def load_movies_to_es(host, port, movies):
-    """Load movies data to ElasticSearch."""
+    """Load movies data to ElasticSearch.
+
+    Returns whether the movies index was created for them.
+    """
     try:
         es = Elasticsearch([{'host': host, 'port': port}])
-        if not es.indices.exists('movies'):
-            raise Exception('Index not created in ElasticSearch')
+        created = ensure_index(es, 'movies')
         es.bulk(index='movies', body=movies)
+        return created
+    finally:
+        es.close()
+
+
+@backoff.on_exception(
+    backoff.expo, exceptions.ConnectionError,
+    max_time=60, logger=logger,
+)
+def update_similar_movies(host, port, movie_ids, size, batch_size=100):
+    """Store ids of the most similar movies on documents of movies.
+
+    Queries are built from the stored documents, so the movies must be
+    loaded before, and the whole load should be, for similar movies to
+    be found among all movies.
+    """
+    try:
+        es = Elasticsearch([{'host': host, 'port': port}])
+        es.indices.refresh(index='movies')
+        for start in range(0, len(movie_ids), batch_size):
+            batch_ids = movie_ids[start:start + batch_size]
+            docs = es.mget(
+                index='movies', body={'ids': batch_ids},
+                _source_includes=[
+                    f'{path}.id' for path, _ in SIMILARITY_BOOSTS
+                ],
+            )['docs']
+            docs = [doc for doc in docs if doc.get('found')]
+            searches = []
+            for doc in docs:
+                searches += [
+                    {'index': 'movies'},
+                    Movie.get_similar_query(doc['_id'], doc['_source'], size),
+                ]
+            if not searches:
+                continue
+            responses = es.msearch(body=searches)['responses']
+            actions = []
+            for doc, response in zip(docs, responses):
+                hits = response.get('hits', {}).get('hits', [])
+                similar_ids = [hit['_id'] for hit in hits]
+                actions += [
+                    {'update': {'_index': 'movies', '_id': doc['_id']}},
+                    {'doc': {'similar_ids': similar_ids}},
+                ]
+            es.bulk(body=actions)
     finally:
         es.close()
 
@@ -22,8 +101,7 @@ def load_persons_to_es(host, port, persons):
     """Load persons data to ElasticSearch."""
     try:
         es = Elasticsearch([{'host': host, 'port': port}])
-        if not es.indices.exists('persons'):
-            raise Exception('Index not created in ElasticSearch')
+        ensure_index(es, 'persons')
         es.bulk(index='persons', body=persons)
     finally:
         es.close()
@@ -33,8 +111,7 @@ def load_genres_to_es(host, port, genres):
     """Load genres data to ElasticSearch."""
     try:
         es = Elasticsearch([{'host': host, 'port': port}])
-        if not es.indices.exists('genres'):
-            raise Exception('Index not created in ElasticSearch')
+        ensure_index(es, 'genres')
         es.bulk(index='genres', body=genres)
     finally:
         es.close()
@@ -1,4 +1,5 @@
 import argparse
+import cProfile
 import datetime
 import os
 from abc import ABCMeta, abstractmethod
@@ -8,9 +9,11 @@ from loguru import logger
 
 from constants import UpdateTypes
 from elastic_loader import (load_genres_to_es, load_movies_to_es,
-                            load_persons_to_es)
+                            load_persons_to_es, update_similar_movies)
 from postgres_extractor import PostgresMoviesExtractor
+from progress import ProgressReporter
 from state_storage import RedisStateStorage
+from top_rated import TopRatedMovies
 from transform_entities import Genre, Movie, Person, RelatedPersonMovie
 
 
@@ -22,6 +25,13 @@ class BaseETLFromPostgresToES(metaclass=ABCMeta):
         self.update_type = kwargs.get('update_type')
         self.redis_key = kwargs.get('redis_key')
         self.state_storage = RedisStateStorage(redis.Redis())
+        self.es_host = os.getenv('ES_HOST', 'localhost')
+        self.es_port = os.getenv('ES_PORT', 9200)
+        self.progress = ProgressReporter(
+            type(self).__name__,
+            interval=float(os.getenv('ETL_PROGRESS_INTERVAL', 10)),
+            sample_rate=float(os.getenv('ETL_LOG_SAMPLE_RATE', 0)),
+        )
 
     def __call__(self, *args, **kwargs):
         """Call ETL process."""
@@ -46,10 +56,24 @@ class BaseETLFromPostgresToES(metaclass=ABCMeta):
         """Load data to ElasticSearch."""
         pass
 
+    def load_batch(self, load_to_es, batch):
+        """Load batch of documents to ElasticSearch and count them."""
+        with self.progress.timer('bulk'):
+            result = load_to_es(self.es_host, self.es_port, batch)
+        # Batch holds an action and a document for every item
+        self.progress.count('documents_loaded', len(batch) // 2)
+        return result
+
 
 class ETLMoviesFromPostgresToES(BaseETLFromPostgresToES):
     """ETL for load movies data from postgres to elasticsearch."""
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.top_rated = TopRatedMovies(self.state_storage.redis_adapter)
+        self.is_full_load = False
+        self.movies_loaded = False
+
     def transform(self, loader):
         """Transform movies data to specific structure
         for further load to elasticsearch."""
@@ -79,7 +103,7 @@ class ETLMoviesFromPostgresToES(BaseETLFromPostgresToES):
                 continue
 
             if current_movie and current_movie.id != movie.id:
-                logger.info(f'Transformed movie for ES: \n {current_movie}')
+                self.progress.count('documents_out', payload=current_movie)
                 loader.send(current_movie)
                 current_movie = movie
 
@@ -95,44 +119,92 @@ class ETLMoviesFromPostgresToES(BaseETLFromPostgresToES):
             state_time_for_start, self.update_type
         )
         try:
+            if self.update_type == UpdateTypes.MOVIES.value:
+                self.is_full_load = self.starts_before_all_movies(
+                    movies_extractor, state_time_for_start
+                )
+            if self.is_full_load:
+                # Sets are rebuilt, so movies deleted since are dropped
+                self.top_rated.reset()
             movies = movies_extractor.get_movies()
             for row in movies:
-                logger.info(f'Extracted movie row: \n {row}')
+                self.progress.count('rows_in', payload=row)
                 transformer.send(row)
+        except Exception:
+            # Failed load doesn't make the sets complete
+            self.is_full_load = False
+            raise
         finally:
             movies_extractor.connection.close()
             transformer.close()
 
+    @staticmethod
+    def starts_before_all_movies(extractor, start_time):
+        """Check whether load from the time goes through all movies."""
+        if start_time is None:
+            return False
+        first_modified = extractor.get_first_modified()
+        if first_modified is None:
+            return True
+        if start_time.tzinfo is None:
+            first_modified = first_modified.replace(tzinfo=None)
+        return start_time <= first_modified
+
+    def load_movies(self, batch_of_movies, changed_movies):
+        """Load batch of movies and update sets of top rated movies."""
+        if self.load_batch(load_movies_to_es, batch_of_movies):
+            # Sets hold movies of the index which is gone, the new one
+            # has only movies loaded from now on
+            self.top_rated.reset()
+            self.is_full_load = self.is_full_load and not self.movies_loaded
+        self.movies_loaded = True
+        with self.progress.timer('top_rated'):
+            self.top_rated.update(changed_movies)
+
     def load(self, max_batch_size=100):
         """Load transformed movies data to elasticsearch."""
-        es_host = os.getenv('ES_HOST', 'localhost')
-        es_port = os.getenv('ES_PORT', 9200)
+        similar_movies_count = int(os.getenv('SIMILAR_MOVIES_COUNT', 10))
 
         batch_of_movies = []
+        changed_movies = []
+        # Similar movies are found once all changed movies are loaded,
+        # so they are searched among the whole catalogue
+        changed_ids = set()
         last_updated_time = None
         while True:
             try:
                 movie = (yield)
             except GeneratorExit:
                 if batch_of_movies:
-                    load_movies_to_es(es_host, es_port, batch_of_movies)
-                    logger.info(f'Load movies to ES: \n {batch_of_movies}')
+                    self.load_movies(batch_of_movies, changed_movies)
+                if changed_ids:
+                    with self.progress.timer('similar'):
+                        update_similar_movies(
+                            self.es_host, self.es_port,
+                            sorted(changed_ids), similar_movies_count,
+                        )
+                if self.is_full_load:
+                    self.top_rated.mark_complete()
                 self.state_storage.delete_state(self.redis_key)
-                logger.info('Load to ES finished!')
+                self.state_storage.mark_loaded(UpdateTypes.MOVIES.value)
+                self.progress.finish()
                 return
 
             if movie:
                 last_updated_time = movie.modified
                 formatted_movie = movie.get_format_for_es()
                 batch_of_movies += formatted_movie
+                changed_movies.append(movie)
+                changed_ids.add(str(movie.id))
 
             if len(batch_of_movies) >= max_batch_size:
-                logger.info(f'Load movies to ES: \n {batch_of_movies}')
-                load_movies_to_es(es_host, es_port, batch_of_movies)
+                self.load_movies(batch_of_movies, changed_movies)
                 self.state_storage.save_state(
                     last_updated_time, self.redis_key
                 )
+                self.progress.set_checkpoint(last_updated_time)
                 batch_of_movies = []
+                changed_movies = []
 
 
 class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
@@ -160,7 +232,7 @@ class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
             if current_person.id == person.id:
                 current_person.related_movies.append(related_movie)
             else:
-                logger.info(f'Transformed person for ES: \n {current_person}')
+                self.progress.count('documents_out', payload=current_person)
                 loader.send(current_person)
                 current_person = person
                 current_person.related_movies.append(related_movie)
@@ -179,7 +251,7 @@ class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
         try:
             persons = extractor.get_updated_persons()
             for row in persons:
-                logger.info(f'Extracted person row: \n {row}')
+                self.progress.count('rows_in', payload=row)
                 transformer.send(row)
         finally:
             extractor.connection.close()
@@ -187,9 +259,6 @@ class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
 
     def load(self, max_batch_size=100):
         """Load transformed persons data to elasticsearch."""
-        es_host = os.getenv('ES_HOST', 'localhost')
-        es_port = os.getenv('ES_PORT', 9200)
-
         batch_of_persons = []
         last_updated_time = None
         while True:
@@ -197,10 +266,10 @@ class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
                 person = (yield)
             except GeneratorExit:
                 if batch_of_persons:
-                    load_persons_to_es(es_host, es_port, batch_of_persons)
-                    logger.info(f'Load persons to ES: \n {batch_of_persons}')
+                    self.load_batch(load_persons_to_es, batch_of_persons)
                 self.state_storage.delete_state(self.redis_key)
-                logger.info('Load to ES finished!')
+                self.state_storage.mark_loaded(UpdateTypes.PERSONS.value)
+                self.progress.finish()
                 return
 
             if person:
@@ -209,11 +278,11 @@ class ETLPersonsFromPostgresToES(BaseETLFromPostgresToES):
                 batch_of_persons += formatted_person
 
             if len(batch_of_persons) >= max_batch_size:
-                logger.info(f'Load persons to ES: \n {batch_of_persons}')
-                load_persons_to_es(es_host, es_port, batch_of_persons)
+                self.load_batch(load_persons_to_es, batch_of_persons)
                 self.state_storage.save_state(
                     last_updated_time, self.redis_key
                 )
+                self.progress.set_checkpoint(last_updated_time)
                 batch_of_persons = []
 
 
@@ -231,7 +300,7 @@ class ETLGenresFromPostgresToES(BaseETLFromPostgresToES):
                 raise
 
             genre = Genre.get_genre_from_dict(genre_data)
-            logger.info(f'Transformed genre for ES: \n {genre}')
+            self.progress.count('documents_out', payload=genre)
             loader.send(genre)
 
     def extract(self, transformer):
@@ -249,7 +318,7 @@ class ETLGenresFromPostgresToES(BaseETLFromPostgresToES):
         try:
             genres = extractor.get_updated_genres()
             for row in genres:
-                logger.info(f'Extracted genre row: \n {row}')
+                self.progress.count('rows_in', payload=row)
                 transformer.send(row)
         finally:
             extractor.connection.close()
@@ -258,9 +327,6 @@ class ETLGenresFromPostgresToES(BaseETLFromPostgresToES):
     def load(self, max_batch_size=100):
         """Load transformed genres data to elasticsearch."""
 
-        es_host = os.getenv('ES_HOST', 'localhost')
-        es_port = os.getenv('ES_PORT', 9200)
-
         batch_of_genres = []
         last_updated_time = None
         while True:
@@ -268,9 +334,9 @@ class ETLGenresFromPostgresToES(BaseETLFromPostgresToES):
                 genre = (yield)
             except GeneratorExit:
                 if batch_of_genres:
-                    load_genres_to_es(es_host, es_port, batch_of_genres)
-                    logger.info(f'Load genres to ES: \n {batch_of_genres}')
-                logger.info('Load to ES finished!')
+                    self.load_batch(load_genres_to_es, batch_of_genres)
+                self.state_storage.mark_loaded(UpdateTypes.GENRES.value)
+                self.progress.finish()
                 return
 
             if genre:
@@ -279,9 +345,9 @@ class ETLGenresFromPostgresToES(BaseETLFromPostgresToES):
                 batch_of_genres += formatted_genre
 
             if len(batch_of_genres) >= max_batch_size:
-                logger.info(f'Load genres to ES: \n {batch_of_genres}')
-                load_genres_to_es(es_host, es_port, batch_of_genres)
+                self.load_batch(load_genres_to_es, batch_of_genres)
                 self.state_storage.save_state(last_updated_time, self.redis_key)
+                self.progress.set_checkpoint(last_updated_time)
                 batch_of_genres = []
 
 
@@ -302,8 +368,14 @@ def parse() -> tuple:
         choices=list(UpdateTypes),
         required=True
     )
+    parser.add_argument(
+        '--profile',
+        help='Path to save profile of the ETL process in pstats format. '
+             'Render it as a flame graph with e.g. flameprof or snakeviz.',
+        required=False
+    )
     args = parser.parse_args()
-    return args.update_type.value, args.update_time
+    return args.update_type.value, args.update_time, args.profile
 
 
 def start_etl(update_type, update_time=None):
@@ -343,5 +415,11 @@ def start_etl(update_type, update_time=None):
 
 
 if __name__ == '__main__':
-    update_type, update_time = parse()
-    start_etl(update_type, update_time)
+    update_type, update_time, profile_path = parse()
+    if profile_path:
+        profiler = cProfile.Profile()
+        profiler.runcall(start_etl, update_type, update_time)
+        profiler.dump_stats(profile_path)
+        logger.info(f'Profile of ETL saved to {profile_path}')
+    else:
+        start_etl(update_type, update_time)
@@ -35,6 +35,11 @@ class PostgresMoviesExtractor:
             **self.dsl, cursor_factory=DictCursor
         )
 
+    def get_first_modified(self):
+        """Get time of the earliest movie modification."""
+        self.cursor.execute('SELECT min(modified) FROM movies_filmwork;')
+        return self.cursor.fetchone()[0]
+
     def get_updated_persons_ids(self) -> tuple:
         """Get updated persons ids."""
         query = """
@@ -0,0 +1,93 @@
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from loguru import logger
+
+
+class ProgressReporter:
+    """Counters of ETL stages which are logged periodically.
+
+    Instead of logging every item, counts and rates of stages, average
+    time of timed operations and lag of the checkpoint behind now are
+    logged at most once per `interval` seconds. Payloads of items are
+    logged at debug level for a random sample of them only.
+    """
+
+    def __init__(self, name, interval=10.0, sample_rate=0.0):
+        self.name = name
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.counts = Counter()
+        self.durations = Counter()
+        self.calls = Counter()
+        self.checkpoint = None
+        self.started_at = self.reported_at = time.monotonic()
+        self.reported_counts = Counter()
+
+    def count(self, stage, number=1, payload=None):
+        """Count items passed through the stage."""
+        self.counts[stage] += number
+        if (
+            payload is not None
+            and self.sample_rate
+            and random.random() < self.sample_rate
+        ):
+            logger.debug(f'{self.name} {stage} sample: {payload}')
+        self._report_if_due()
+
+    @contextmanager
+    def timer(self, operation):
+        """Measure time of the operation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[operation] += time.perf_counter() - start
+            self.calls[operation] += 1
+            self._report_if_due()
+
+    def set_checkpoint(self, checkpoint):
+        """Remember time of the last saved state."""
+        self.checkpoint = checkpoint
+
+    def finish(self):
+        """Log totals of the whole run."""
+        now = time.monotonic()
+        stats = self._get_stats(now - self.started_at, Counter())
+        logger.bind(etl=self.name, **stats).info(
+            f'{self.name} finished: {self._format(stats)}'
+        )
+
+    def _report_if_due(self):
+        now = time.monotonic()
+        if now - self.reported_at < self.interval:
+            return
+        stats = self._get_stats(now - self.reported_at, self.reported_counts)
+        logger.bind(etl=self.name, **stats).info(
+            f'{self.name} progress: {self._format(stats)}'
+        )
+        self.reported_at = now
+        self.reported_counts = self.counts.copy()
+
+    def _get_stats(self, elapsed, previous_counts):
+        stats = {}
+        for stage, number in self.counts.items():
+            stats[stage] = number
+            stats[f'{stage}_per_s'] = round(
+                (number - previous_counts[stage]) / max(elapsed, 1e-9), 1
+            )
+        for operation, calls in self.calls.items():
+            stats[f'{operation}_avg_ms'] = round(
+                self.durations[operation] / calls * 1000, 1
+            )
+        if self.checkpoint is not None:
+            now = datetime.now(self.checkpoint.tzinfo)
+            stats['lag_s'] = round((now - self.checkpoint).total_seconds())
+        return stats
+
+    @staticmethod
+    def _format(stats):
+        return ', '.join(f'{name}={value}' for name, value in stats.items())
@@ -22,3 +22,9 @@ class RedisStateStorage:
 
     def delete_state(self, key: str = 'start_from_ts'):
         self.redis_adapter.delete(key)
+
+    def mark_loaded(self, update_type: str):
+        """Save time of the finished load to signal API about changes."""
+        self.redis_adapter.set(
+            f'etl_loaded:{update_type}', datetime.now().isoformat()
+        )
@@ -0,0 +1,83 @@
+import json
+
+import redis
+
+TOP_RATED_KEY = 'top_rated:movies'
+TOP_RATED_GENRE_KEY = 'top_rated:genre:{genre_id}'
+# Sets scored by negated rating, so movies with equal rating
+# go by id ascending in descending listings too, like in ElasticSearch
+TOP_RATED_DESC_KEY = 'top_rated:movies:desc'
+TOP_RATED_GENRE_DESC_KEY = 'top_rated:genre:{genre_id}:desc'
+TOP_RATED_DOCS_KEY = 'top_rated:docs'
+TOP_RATED_COMPLETE_KEY = 'top_rated:complete'
+
+
+class TopRatedMovies:
+    """Redis sorted sets of movie ids by rating, overall and per genre.
+
+    API serves listings sorted by rating from them. Short movie documents
+    are kept in a hash with ids of genres, so that a movie is removed
+    from sets of the genres it no longer belongs to.
+    """
+
+    def __init__(self, redis_adapter: redis.Redis):
+        self.redis_adapter = redis_adapter
+
+    def update(self, movies: list):
+        """Update sets and documents of changed movies."""
+        if not movies:
+            return
+        movie_ids = [str(movie.id) for movie in movies]
+        old_docs = self.redis_adapter.hmget(TOP_RATED_DOCS_KEY, movie_ids)
+        pipe = self.redis_adapter.pipeline()
+        for movie_id, movie, old_doc in zip(movie_ids, movies, old_docs):
+            genre_ids = {str(genre.id) for genre in movie.genres}
+            if old_doc:
+                for genre_id in set(json.loads(old_doc)['genres']) - genre_ids:
+                    pipe.zrem(
+                        TOP_RATED_GENRE_KEY.format(genre_id=genre_id), movie_id
+                    )
+                    pipe.zrem(
+                        TOP_RATED_GENRE_DESC_KEY.format(genre_id=genre_id),
+                        movie_id,
+                    )
+            keys = [(TOP_RATED_KEY, TOP_RATED_DESC_KEY)] + [
+                (
+                    TOP_RATED_GENRE_KEY.format(genre_id=genre_id),
+                    TOP_RATED_GENRE_DESC_KEY.format(genre_id=genre_id),
+                )
+                for genre_id in genre_ids
+            ]
+            rating = movie.imdb_rating
+            if rating is not None:
+                rating = float(rating)
+            for key, desc_key in keys:
+                # Movies without rating go after all rated ones in listings
+                if rating is None:
+                    pipe.zrem(key, movie_id)
+                    pipe.zrem(desc_key, movie_id)
+                else:
+                    pipe.zadd(key, {movie_id: rating})
+                    pipe.zadd(desc_key, {movie_id: -rating})
+            pipe.hset(TOP_RATED_DOCS_KEY, movie_id, json.dumps({
+                'id': movie_id,
+                'title': movie.title,
+                'imdb_rating': rating,
+                'genres': sorted(genre_ids),
+            }))
+        pipe.execute()
+
+    def mark_complete(self):
+        """Signal API that sets hold all movies since a full load."""
+        self.redis_adapter.set(TOP_RATED_COMPLETE_KEY, 1)
+
+    def reset(self):
+        """Remove all sets and documents, API stops using them at once.
+
+        Sets are filled again by loaded movies and hold all of them only
+        after the next full load is finished.
+        """
+        self.redis_adapter.delete(TOP_RATED_COMPLETE_KEY)
+        keys = list(self.redis_adapter.scan_iter(match='top_rated:*'))
+        if keys:
+            self.redis_adapter.delete(*keys)
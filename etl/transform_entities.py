@@ -3,6 +3,8 @@ from dataclasses import dataclass, field
 from datetime import date
 from typing import List, Optional, Set
 
+# Nested fields of movies which make them similar and weights of a match
+SIMILARITY_BOOSTS = (('directors', 3), ('actors', 2), ('genres', 1))
 
 @dataclass
 class RelatedPersonMovie:
@@ -40,6 +42,18 @@ class Person:
             modified=movie_dict.get('modified')
         )
 
+    def get_suggest_input(self) -> dict:
+        """Get input for person name autocomplete.
+
+        Person is suggested by the beginning of any part of the name.
+        """
+        name_parts = self.full_name.split()
+        return {
+            'input': [
+                ' '.join(name_parts[i:]) for i in range(len(name_parts))
+            ] or [self.full_name],
+        }
+
     def get_format_for_es(self) -> list:
         """Get person data for ElasticSearch format structure."""
 
@@ -51,7 +65,8 @@ class Person:
             'related_movies': [
                 {'id': movie.id, 'role': movie.role}
                 for movie in self.related_movies
-            ]
+            ],
+            'full_name_suggest': self.get_suggest_input(),
         }
         return [meta_data, movie_for_es]
 
@@ -164,5 +179,55 @@ class Movie:
             'directors': directors,
             'actors': actors,
             'writers': writers,
+            'title_suggest': {
+                'input': [self.title],
+                'weight': int((self.imdb_rating or 0) * 10),
+            },
         }
         return [meta_data, movie_for_es]
+
+    @staticmethod
+    def get_similar_query(movie_id: str, movie_doc: dict, size: int) -> dict:
+        """Get ElasticSearch query for the most similar movies
+        by the movie document stored in ElasticSearch.
+
+        Every shared director, actor and genre adds to similarity,
+        in that order of weight, ties go to higher rated movies.
+        """
+        shared_entities = (
+            (path, movie_doc.get(path) or [], boost)
+            for path, boost in SIMILARITY_BOOSTS
+        )
+        should = [
+            {
+                'nested': {
+                    'path': path,
+                    'score_mode': 'sum',
+                    'query': {
+                        'constant_score': {
+                            'filter': {
+                                'terms': {
+                                    f'{path}.id': [
+                                        entity['id'] for entity in entities
+                                    ],
+                                },
+                            },
+                            'boost': boost,
+                        },
+                    },
+                },
+            }
+            for path, entities, boost in shared_entities if entities
+        ]
+        return {
+            'size': size,
+            '_source': False,
+            'query': {
+                'bool': {
+                    'should': should,
+                    'minimum_should_match': 1,
+                    'must_not': {'ids': {'values': [movie_id]}},
+                },
+            },
+            'sort': [{'_score': 'desc'}, {'imdb_rating': 'desc'}],
+        }
@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
-from src.api.v1 import genre, movie, person
+from src.api.v1 import genre, movie, person, suggest
+from src.core.limits import limit_requests
 
-api_router = APIRouter()
+api_router = APIRouter(dependencies=[Depends(limit_requests)])
 api_router.include_router(movie.router, prefix="/movies", tags=["movies"])
 api_router.include_router(person.router, prefix="/persons", tags=["persons"])
 api_router.include_router(genre.router, prefix="/genres", tags=["genres"])
+api_router.include_router(suggest.router, prefix="/suggest", tags=["suggest"])
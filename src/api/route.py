@@ -0,0 +1,30 @@
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.core.config import settings
+from src.db.elastic import elastic_timeout
+
+
+class ElasticBudgetRoute(APIRoute):
+    """Route which limits its ElasticSearch requests by timeout budget.
+
+    Budgets are configured by route name in ELASTIC_TIMEOUTS,
+    other routes get ELASTIC_TIMEOUT.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        timeout = settings.ELASTIC_TIMEOUTS.get(
+            self.name, settings.ELASTIC_TIMEOUT
+        )
+
+        async def route_handler(request: Request) -> Response:
+            # Every request is handled in its own task, so the value
+            # stays for streamed responses and doesn't leak to others
+            elastic_timeout.set(timeout)
+            return await handler(request)
+
+        return route_handler
@@ -1,34 +1,49 @@
 from http import HTTPStatus
-from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from src.api.route import ElasticBudgetRoute
+from src.core.etag import not_modified
 from src.models.genre import Genre
 from src.services.genre import GenreService, get_genre_service
 
-router = APIRouter()
+router = APIRouter(route_class=ElasticBudgetRoute)
 
 
 @router.get("/{genre_id}", response_model=Genre)
-@cache(expire=60 * 5)
 async def get_genre_details(
-    genre_id: str, genre_service: GenreService = Depends(get_genre_service)
-) -> Genre:
-    """Represent Genre details."""
+    genre_id: str,
+    request: Request,
+    genre_service: GenreService = Depends(get_genre_service),
+) -> ORJSONResponse:
+    """Represent Genre details.
+
+    Genres are served from in-memory catalogue, so they are not cached.
+    """
+    etag = genre_service.get_etag()
     genre = await genre_service.get_by_id(genre_id)
     if not genre:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="genre not found"
         )
-    return genre
+    if etag:
+        response = not_modified(request, etag)
+        if response:
+            return response
+    return ORJSONResponse(genre, headers={"ETag": etag} if etag else None)
 
 
 @router.get("/", response_model=list[Genre])
-@cache(expire=60 * 5)
 async def get_genres(
+    request: Request,
     genre_service: GenreService = Depends(get_genre_service),
-) -> Optional[list[Genre]]:
+) -> ORJSONResponse:
     """Represent all genres."""
+    etag = genre_service.get_etag()
+    if etag:
+        response = not_modified(request, etag)
+        if response:
+            return response
     genres = await genre_service.get_all()
-    return genres
+    return ORJSONResponse(genres, headers={"ETag": etag} if etag else None)
@@ -2,39 +2,125 @@ from http import HTTPStatus
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_cache.decorator import cache
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-from src.models.movie import Movie
+from src.api.route import ElasticBudgetRoute
+from src.api.v1.params import source_fields
+from src.models.movie import Movie, MovieFacets, MovieShort
 from src.services.movie import MovieService, get_movie_service
+from src.utils.cache import cache, has_cursor
+from src.utils.query_builder import normalize_search_text
+from src.utils.utils import (CURSOR_DESCRIPTION, NDJSON_MEDIA_TYPE,
+                             NEXT_CURSOR_HEADER, CursorExpired)
 
-router = APIRouter()
+router = APIRouter(route_class=ElasticBudgetRoute)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_movies(
+        fields: list[str] = Depends(source_fields(Movie, Movie)),
+        movie_service: MovieService = Depends(get_movie_service),
+) -> StreamingResponse:
+    """Stream all movies as newline delimited JSON."""
+    return StreamingResponse(
+        movie_service.export(fields), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@router.get("/facets", response_model=MovieFacets)
+@cache(expire=60 * 5)
+async def get_movies_facets(
+        search: Optional[str] = Query(None),
+        genres: Optional[list[str]] = Query(None),
+        movie_service: MovieService = Depends(get_movie_service),
+) -> ORJSONResponse:
+    """Represent movies counts by genres and rating buckets."""
+    facets = await movie_service.get_facets(search, genres)
+    return ORJSONResponse(facets)
 
 
 @router.get("/{movie_id}", response_model=Movie)
 @cache(expire=60 * 5)
 async def get_movie_details(
         movie_id: str, movie_service: MovieService = Depends(get_movie_service)
-) -> Movie:
+) -> ORJSONResponse:
     """Represent movie details."""
     movie = await movie_service.get_by_id(movie_id)
     if not movie:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="movie not found"
         )
-    return movie
+    return ORJSONResponse(movie)
 
 
-@router.get("", response_model=list[Movie])
+@router.get(
+    "/{movie_id}/similar",
+    response_model=list[MovieShort],
+    response_model_exclude_unset=True,
+)
 @cache(expire=60 * 5)
+async def get_similar_movies(
+        movie_id: str,
+        fields: list[str] = Depends(source_fields(Movie, MovieShort)),
+        movie_service: MovieService = Depends(get_movie_service),
+) -> ORJSONResponse:
+    """Represent movies similar to the movie."""
+    movies = await movie_service.get_similar(movie_id, fields)
+    if movies is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail="movie not found"
+        )
+    return ORJSONResponse(movies)
+
+
+@router.get(
+    "", response_model=list[MovieShort], response_model_exclude_unset=True
+)
+@cache(expire=60 * 5, skip_if=has_cursor)
 async def get_movies(
         search: Optional[str] = Query(None),
         page: int = Query(1, ge=1),
         size: int = Query(100, ge=1, le=500),
         sort: Optional[str] = Query("imdb_rating", regex="-?imdb_rating$"),
         genres: Optional[list[str]] = Query(None),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        fields: list[str] = Depends(source_fields(Movie, MovieShort)),
         movie_service: MovieService = Depends(get_movie_service),
-) -> list[Movie]:
+) -> ORJSONResponse:
     """Represent all movies with optional filters."""
-    if search:
-        return await movie_service.search_movies(page, size, search)
-    return await movie_service.get_all(page, size, sort, genres)
+    # Blank search is a plain listing, as it is for the cache key
+    search = normalize_search_text(search)
+    if cursor is None:
+        if search:
+            movies = await movie_service.search_movies(
+                page, size, search, fields
+            )
+        else:
+            movies = await movie_service.get_all(
+                page, size, sort, genres, fields
+            )
+        return ORJSONResponse(movies)
+
+    try:
+        if search:
+            movies, next_cursor = await movie_service.search_movies_by_cursor(
+                cursor, size, search, fields
+            )
+        else:
+            movies, next_cursor = await movie_service.get_all_by_cursor(
+                cursor, size, sort, genres, fields
+            )
+    except CursorExpired:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE, detail="cursor expired"
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor"
+        )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return ORJSONResponse(movies, headers=headers)
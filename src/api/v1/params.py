@@ -0,0 +1,37 @@
+from http import HTTPStatus
+from typing import Callable, Optional, Type
+
+from fastapi import HTTPException, Query
+
+from src.models.base import Base
+
+
+def source_fields(
+        schema: Type[Base], default_schema: Type[Base]
+) -> Callable[..., list[str]]:
+    """Get dependency to parse sparse fieldset of `schema` objects.
+
+    Without `fields` parameter fields of `default_schema` are returned.
+    Object id is always included.
+    """
+    allowed = set(schema.__fields__)
+
+    def get_source_fields(
+            fields: Optional[str] = Query(
+                None,
+                description="Comma separated fields to return, "
+                            f"any of: {', '.join(schema.__fields__)}.",
+            ),
+    ) -> list[str]:
+        if not fields:
+            return list(default_schema.__fields__)
+        requested = {field.strip() for field in fields.split(",")} - {""}
+        unknown = requested - allowed
+        if unknown:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return ["id", *sorted(requested - {"id"})]
+
+    return get_source_fields
@@ -1,32 +1,77 @@
 from http import HTTPStatus
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi_cache.decorator import cache
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
-from src.models.movie import Movie
-from src.models.person import Person
+from src.api.route import ElasticBudgetRoute
+from src.api.v1.params import source_fields
+from src.models.movie import Movie, MovieShort
+from src.models.person import Person, PersonShort
 from src.services.person import PersonService, get_person_service
+from src.utils.cache import cache, has_cursor
+from src.utils.utils import (CURSOR_DESCRIPTION, NDJSON_MEDIA_TYPE,
+                             NEXT_CURSOR_HEADER, CursorExpired)
 
-router = APIRouter()
+router = APIRouter(route_class=ElasticBudgetRoute)
 
 
-@router.get("/{person_id}/movies/", response_model=list[Movie])
-@cache(expire=60 * 5)
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_persons(
+        fields: list[str] = Depends(source_fields(Person, Person)),
+        person_service: PersonService = Depends(get_person_service)
+) -> StreamingResponse:
+    """Stream all persons as newline delimited JSON."""
+    return StreamingResponse(
+        person_service.export(fields), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+@router.get(
+    "/{person_id}/movies/",
+    response_model=list[MovieShort],
+    response_model_exclude_unset=True,
+)
+@cache(expire=60 * 5, skip_if=has_cursor)
 async def get_person_movies(
         person_id: str,
         page: int = Query(1, ge=1),
         size: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        fields: list[str] = Depends(source_fields(Movie, MovieShort)),
         person_service: PersonService = Depends(get_person_service)
-) -> list[Movie]:
+) -> ORJSONResponse:
     """Represent all person movies."""
-    person_movies = await person_service.get_person_movies(
-        page, size, person_id
-    )
+    next_cursor = None
+    if cursor is None:
+        person_movies = await person_service.get_person_movies(
+            page, size, person_id, fields
+        )
+    else:
+        try:
+            person_movies, next_cursor = (
+                await person_service.get_person_movies_by_cursor(
+                    cursor, size, person_id, fields
+                )
+            )
+        except CursorExpired:
+            raise HTTPException(
+                status_code=HTTPStatus.GONE, detail="cursor expired"
+            )
+        except ValueError:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor"
+            )
     if person_movies is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="person not found"
         )
-    return person_movies
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return ORJSONResponse(person_movies, headers=headers)
 
 
 @router.get("/{person_id}", response_model=Person)
@@ -35,7 +80,7 @@ async def get_person_details(
         person_id: str, person_service: PersonService = Depends(
             get_person_service
         )
-) -> Person:
+) -> ORJSONResponse:
     """Represent Person details."""
     person = await person_service.get_by_id(person_id)
 
@@ -43,16 +88,38 @@ async def get_person_details(
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="person not found"
         )
-    return person
+    return ORJSONResponse(person)
 
 
-@router.get("/", response_model=list[Person])
-@cache(expire=60 * 5)
+@router.get(
+    "/", response_model=list[PersonShort], response_model_exclude_unset=True
+)
+@cache(expire=60 * 5, skip_if=has_cursor)
 async def get_persons(
         search: str,
         page: int = Query(1, ge=1),
         size: int = Query(100, ge=1, le=500),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        fields: list[str] = Depends(source_fields(Person, PersonShort)),
         person_service: PersonService = Depends(get_person_service)
-) -> list[Person]:
+) -> ORJSONResponse:
     """Represent persons founded by specific search query."""
-    return await person_service.search_persons(page, size, search)
+    if cursor is None:
+        persons = await person_service.search_persons(
+            page, size, search, fields
+        )
+        return ORJSONResponse(persons)
+    try:
+        persons, next_cursor = await person_service.search_persons_by_cursor(
+            cursor, size, search, fields
+        )
+    except CursorExpired:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE, detail="cursor expired"
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor"
+        )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return ORJSONResponse(persons, headers=headers)
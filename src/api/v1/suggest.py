@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+
+from src.api.route import ElasticBudgetRoute
+from src.core.config import settings
+from src.models.suggest import Suggestion
+from src.services.suggest import SuggestService, get_suggest_service
+from src.utils.cache import cache
+
+router = APIRouter(route_class=ElasticBudgetRoute)
+
+
+@router.get("", response_model=list[Suggestion])
+@cache(expire=settings.SUGGEST_CACHE_EXPIRE)
+async def get_suggestions(
+        prefix: str = Query(..., min_length=1, max_length=100),
+        size: int = Query(5, ge=1, le=20),
+        suggest_service: SuggestService = Depends(get_suggest_service),
+) -> ORJSONResponse:
+    """Represent movies and persons for autocomplete by prefix."""
+    suggestions = await suggest_service.suggest(prefix, size)
+    return ORJSONResponse(suggestions)
@@ -0,0 +1,42 @@
+import time
+
+
+class CircuitBreaker:
+    """Circuit breaker to fail fast while a dependency is unavailable.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are rejected for `recovery_time` seconds. Then one trial call is
+    let through per `recovery_time`: its success closes the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_time: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow_request(self) -> bool:
+        """Check whether a call may be made now."""
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.recovery_time:
+            # Keep the circuit open for others while the trial is made
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or (
+                self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
@@ -1,6 +1,8 @@
 import os
 from logging import config as logging_config
 
+from typing import Optional
+
 from pydantic import BaseSettings
 
 from src.core.logger import LOGGING
@@ -13,9 +15,132 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str
     REDIS_PORT: int = 6379
+    # Max connections of the pool, requests wait for a free one up to
+    # REDIS_TIMEOUT, the same timeout applies to socket operations
+    REDIS_POOL_SIZE: int = 50
+    REDIS_TIMEOUT: float = 1.0
+    REDIS_CONNECT_TIMEOUT: float = 1.0
+    # Idle connections are checked before use after the interval, seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
 
     ELASTIC_HOST: str
     ELASTIC_PORT: int = 9200
+    # More nodes as host:port, requests are balanced round-robin
+    ELASTIC_HOSTS: list[str] = []
+    # Discover nodes of the cluster at start, on connection failure
+    # and every ELASTIC_SNIFF_INTERVAL seconds
+    ELASTIC_SNIFF: bool = False
+    ELASTIC_SNIFF_INTERVAL: Optional[float] = 60.0
+    # Max connections to each node
+    ELASTIC_POOL_SIZE: int = 10
+    ELASTIC_PIT_KEEP_ALIVE: str = "1m"
+    ELASTIC_EXPORT_BATCH_SIZE: int = 1000
+    # Timeout of ElasticSearch requests by route name and default one
+    ELASTIC_TIMEOUTS: dict[str, float] = {
+        "export_movies": 10.0,
+        "export_persons": 10.0,
+        "get_movies_facets": 2.0,
+    }
+    ELASTIC_TIMEOUT: float = 1.0
+    # Circuit breaker opens after the number of consecutive failures
+    # and lets a trial request through after recovery time, seconds
+    ELASTIC_BREAKER_FAILURES: int = 5
+    ELASTIC_BREAKER_RECOVERY_TIME: float = 10.0
+    # Pass documents of our own indices to responses without validation
+    ELASTIC_TRUSTED_SOURCE: bool = True
+
+    # Serve movies listings sorted by rating from Redis sets kept by ETL
+    MOVIES_LISTING_FROM_REDIS: bool = True
+
+    # Movie facets: max number of genres and width of rating buckets
+    FACETS_GENRES_SIZE: int = 100
+    FACETS_RATING_INTERVAL: float = 1.0
+
+    # Requests replayed to warm cache at startup and after ETL loads
+    CACHE_WARM_PATHS: list[str] = [
+        "/api/v1/movies",
+        "/api/v1/movies?page=2",
+        "/api/v1/movies?sort=-imdb_rating",
+        "/api/v1/movies?sort=-imdb_rating&page=2",
+        "/api/v1/movies/facets",
+    ]
+    # Number of the most requested paths to warm in addition
+    CACHE_WARM_TOP_N: int = 100
+    CACHE_WARM_CONCURRENCY: int = 4
+    # How often to flush access statistics and check ETL loads, seconds
+    CACHE_WARM_CHECK_INTERVAL: int = 10
+    # Warming of the same data is done by one process of all workers and
+    # instances, others skip it for this time, seconds
+    CACHE_WARM_LOCK_TTL: int = 600
+
+    # Autocomplete results are cached shortly since prefixes are popular
+    SUGGEST_CACHE_EXPIRE: int = 30
+
+    # How often to check ETL signal about genres changes, seconds
+    GENRES_CHECK_INTERVAL: int = 10
+    # Max age of in-memory genre catalogue before full reload, seconds
+    GENRES_MAX_AGE: int = 60 * 10
+
+    # Store rendered response bytes in cache and send them as is on hit
+    CACHE_RESPONSE_BYTES: bool = True
+    # Larger response bodies are cached compressed with brotli and gzip
+    # too, the variant is chosen by Accept-Encoding of requests
+    CACHE_COMPRESS_MIN_SIZE: int = 1024
+    CACHE_BROTLI_QUALITY: int = 6
+    CACHE_GZIP_LEVEL: int = 6
+    # How long expired cache entries are kept to serve them while
+    # ElasticSearch is unavailable: the number of their expire times,
+    # but not longer than the limit, seconds
+    CACHE_STALE_RATIO: float = 2.0
+    CACHE_STALE_TTL: int = 60 * 60
+
+    # Token buckets per client and cost class of routes: refill rate
+    # per second and burst. Clients are told apart by API key header if
+    # the key is one of RATE_LIMIT_API_KEYS, by IP address otherwise.
+    # Routes not listed are of "detail" class
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_KEY_HEADER: str = "X-API-Key"
+    RATE_LIMIT_API_KEYS: set[str] = set()
+    RATE_LIMITS: dict[str, tuple[float, int]] = {
+        "detail": (50.0, 100),
+        "search": (10.0, 20),
+        "export": (0.1, 2),
+    }
+    RATE_LIMIT_CLASSES: dict[str, str] = {
+        "get_movies": "search",
+        "get_movies_facets": "search",
+        "get_persons": "search",
+        "get_person_movies": "search",
+        "export_movies": "export",
+        "export_persons": "export",
+    }
+    # Requests in flight per worker above which routes of the class are
+    # rejected, so expensive requests are shed before cheap ones
+    SHED_IN_FLIGHT_LIMITS: dict[str, int] = {
+        "export": 8,
+        "search": 64,
+        "detail": 256,
+    }
+
+    # Requests with X-Profile header equal to the token are profiled,
+    # profiling is disabled when the token is not set
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_DIR: str = "/var/tmp/profiles"
+    PROFILING_INTERVAL: float = 0.001
+
+    # Production server: workers default to the number of available cores,
+    # each one is restarted after max requests to contain memory growth
+    WORKERS: Optional[int] = None
+    WORKER_MAX_REQUESTS: int = 10000
+    WORKER_MAX_REQUESTS_JITTER: int = 1000
+    WORKER_GRACEFUL_TIMEOUT: int = 30
+    WORKER_KEEPALIVE: int = 5
+
+    # Connections opened and verified at startup before the app is ready
+    ELASTIC_POOL_WARM: int = 4
+    REDIS_POOL_WARM: int = 4
+    # How often usage of connection pools is recorded, seconds
+    POOL_METRICS_INTERVAL: int = 5
 
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -0,0 +1,76 @@
+import hashlib
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def make_etag(body: bytes) -> str:
+    """Make strong ETag from hash of response body."""
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check whether ETag is listed in If-None-Match header."""
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Get 304 response if client has the version with the ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+class ConditionalGetMiddleware:
+    """Middleware to answer GET requests with 304 when ETag matches.
+
+    Routes and cache set ETag header of responses. When the client already
+    has the version, only headers are sent and the body is dropped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if_none_match = None
+        if scope["type"] == "http" and scope["method"] == "GET":
+            if_none_match = Headers(scope=scope).get("if-none-match")
+        if not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        is_not_modified = False
+
+        async def send_wrapper(message: Message):
+            nonlocal is_not_modified
+            if message["type"] == "http.response.start":
+                etag = Headers(raw=message["headers"]).get("etag")
+                if (
+                    message["status"] == 200
+                    and etag
+                    and etag_matches(if_none_match, etag)
+                ):
+                    is_not_modified = True
+                    message = {
+                        "type": "http.response.start",
+                        "status": 304,
+                        "headers": [
+                            (name, value)
+                            for name, value in message["headers"]
+                            if name != b"content-length"
+                        ],
+                    }
+            elif message["type"] == "http.response.body" and is_not_modified:
+                if message.get("more_body", False):
+                    return
+                message = {"type": "http.response.body", "body": b""}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,125 @@
+import hashlib
+import math
+from functools import lru_cache
+from http import HTTPStatus
+from typing import AsyncIterator
+
+from aioredis import Redis
+from aioredis.exceptions import RedisError
+from fastapi import Depends, HTTPException, Request
+
+from src.core.config import settings
+from src.core.metrics import REQUESTS_REJECTED
+from src.db.redis import get_redis
+
+# Refill the bucket for time passed since the last request and take the
+# cost if there are enough tokens, otherwise tell how long to wait.
+# Time of Redis is used, so all workers share the same clock.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+DEFAULT_COST_CLASS = "detail"
+
+_in_flight = 0
+
+
+class RateLimiter:
+    """Token buckets kept in Redis and updated atomically by a script."""
+
+    def __init__(self, redis: Redis):
+        self.script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(
+            self, key: str, rate: float, burst: int, cost: int = 1
+    ) -> float:
+        """Take tokens from the bucket, get seconds to wait if it's empty."""
+        retry_after = await self.script(keys=[key], args=[rate, burst, cost])
+        return float(retry_after)
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(redis: Redis) -> RateLimiter:
+    """Get rate limiter of Redis client, its script is registered once."""
+    return RateLimiter(redis)
+
+
+def get_cost_class(request: Request) -> str:
+    """Get cost class of the route which handles the request."""
+    endpoint = request.scope.get("endpoint")
+    route = endpoint.__name__ if endpoint else ""
+    return settings.RATE_LIMIT_CLASSES.get(route, DEFAULT_COST_CLASS)
+
+
+def get_client_id(request: Request) -> str:
+    """Identify client by API key or by IP address without a known key.
+
+    Unknown keys are ignored, otherwise a client could get a fresh
+    bucket for every request by sending random keys.
+    """
+    api_key = request.headers.get(settings.RATE_LIMIT_KEY_HEADER)
+    if api_key and api_key in settings.RATE_LIMIT_API_KEYS:
+        return f"key:{hashlib.md5(api_key.encode()).hexdigest()}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def limit_requests(
+        request: Request, redis: Redis = Depends(get_redis)
+) -> AsyncIterator[None]:
+    """Reject requests over rate limit of the client or under overload.
+
+    Routes are grouped in cost classes. Every client has a token bucket
+    per class, and when too many requests are in flight in the worker,
+    expensive classes are shed before cheap ones.
+    """
+    global _in_flight
+    if request.scope.get("cache_warmer"):
+        yield
+        return
+    cost_class = get_cost_class(request)
+    in_flight_limit = settings.SHED_IN_FLIGHT_LIMITS.get(cost_class)
+    if in_flight_limit is not None and _in_flight >= in_flight_limit:
+        REQUESTS_REJECTED.labels("overload", cost_class).inc()
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="server is overloaded",
+            headers={"Retry-After": "1"},
+        )
+    if settings.RATE_LIMIT_ENABLED and cost_class in settings.RATE_LIMITS:
+        rate, burst = settings.RATE_LIMITS[cost_class]
+        key = f"rate_limit:{cost_class}:{get_client_id(request)}"
+        try:
+            retry_after = await get_rate_limiter(redis).acquire(
+                key, rate, burst
+            )
+        except (RedisError, OSError):
+            # Clients are served without limits while Redis is unavailable
+            retry_after = 0
+        if retry_after:
+            REQUESTS_REJECTED.labels("rate_limit", cost_class).inc()
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail="too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
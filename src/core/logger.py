@@ -1,3 +1,7 @@
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_DEFAULT_HANDLERS = [
     "console",
@@ -55,3 +59,19 @@ LOGGING = {
         "handlers": LOG_DEFAULT_HANDLERS,
     },
 }
+
+
+def start_queue_logging() -> QueueListener:
+    """Hand log records of root logger to a thread over a queue.
+
+    Records are formatted and written by the listener thread,
+    so handling of requests doesn't wait for the output.
+    """
+    root = logging.getLogger()
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue, *root.handlers, respect_handler_level=True
+    )
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
@@ -0,0 +1,113 @@
+import os
+import time
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest)
+from prometheus_client.multiprocess import MultiProcessCollector
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+SIZE_BUCKETS = tuple(2 ** power for power in range(8, 24, 2))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route.",
+    ["route", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of HTTP response bodies by route.",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "route_cache_requests_total",
+    "Route cache lookups by result: hit, miss, stale, skip or refresh.",
+    ["route", "result"],
+)
+CACHE_BACKEND_LATENCY = Histogram(
+    "route_cache_backend_duration_seconds",
+    "Latency of route cache backend operations.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+ELASTIC_LATENCY = Histogram(
+    "elastic_request_duration_seconds",
+    "Latency of ElasticSearch requests measured by the client.",
+    ["operation", "index"],
+    buckets=LATENCY_BUCKETS,
+)
+ELASTIC_TOOK = Histogram(
+    "elastic_took_seconds",
+    "Time of ElasticSearch requests reported by the server.",
+    ["operation", "index"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "Requests rejected by reason: rate_limit or overload.",
+    ["reason", "cost_class"],
+)
+POOL_CONNECTIONS = Gauge(
+    "client_pool_connections",
+    "Connections of client pools by state: in_use, open or max.",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+
+
+class MetricsMiddleware:
+    """Middleware to record latency and response size of HTTP requests.
+
+    Requests are labeled by name of the route endpoint,
+    so number of label values doesn't depend on path parameters.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("cache_warmer"):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            endpoint = scope.get("endpoint")
+            route = endpoint.__name__ if endpoint else "unmatched"
+            REQUEST_LATENCY.labels(route, scope["method"], status).observe(
+                time.perf_counter() - start
+            )
+            RESPONSE_SIZE.labels(route).observe(size)
+
+
+def metrics_response() -> Response:
+    """Get response with all metrics in Prometheus text format.
+
+    With several worker processes metrics of all of them are collected
+    from PROMETHEUS_MULTIPROC_DIR.
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
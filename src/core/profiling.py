@@ -0,0 +1,61 @@
+import hmac
+import logging
+import os
+import uuid
+
+from pyinstrument import Profiler
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+class ProfilingMiddleware:
+    """Middleware to profile single requests on demand.
+
+    Request with `X-Profile` header equal to PROFILING_TOKEN is run under
+    the sampling profiler. The profile is saved as HTML report to
+    PROFILING_DIR and its file name is returned in `X-Profile-Id` header.
+    The middleware is added only when PROFILING_TOKEN is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.token = settings.PROFILING_TOKEN.encode()
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        token = (
+            dict(scope["headers"]).get(PROFILE_HEADER)
+            if scope["type"] == "http" else None
+        )
+        if not token or not hmac.compare_digest(token, self.token):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{uuid.uuid4().hex}.html"
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode()),
+                ]
+            await send(message)
+
+        profiler = Profiler(
+            interval=settings.PROFILING_INTERVAL, async_mode="enabled"
+        )
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            path = os.path.join(settings.PROFILING_DIR, profile_id)
+            with open(path, "w") as profile_file:
+                profile_file.write(profiler.output_html())
+            logger.info("Profile of %s saved to %s", scope["path"], path)
@@ -0,0 +1,118 @@
+import glob
+import math
+import os
+from typing import Any, Optional
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.importer import import_from_string
+from uvicorn.workers import UvicornWorker
+
+from src.core.config import settings
+from src.core.logger import start_queue_logging
+
+_log_listener = None
+
+
+class UvloopWorker(UvicornWorker):
+    """Uvicorn worker with uvloop event loop and httptools parser."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """Get CPU quota of the container in cores, None if it's not limited.
+
+    cgroup v2 keeps quota and period in cpu.max, v1 in separate files.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as quota_file:
+                quota = quota_file.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as period_file:
+                period = period_file.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def available_cores() -> int:
+    """Get number of cores given to the process.
+
+    Both CPU affinity and CPU quota of the container limit them,
+    the quota is rounded up to whole cores.
+    """
+    cores = len(os.sched_getaffinity(0))
+    cpu_limit = _cgroup_cpu_limit()
+    if cpu_limit is not None:
+        cores = min(cores, max(1, math.ceil(cpu_limit)))
+    return cores
+
+
+def clear_metrics_dir() -> None:
+    """Remove metrics left in PROMETHEUS_MULTIPROC_DIR by previous run."""
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def post_worker_init(worker) -> None:
+    global _log_listener
+    # Listener thread doesn't survive fork, so it's started in the worker
+    _log_listener = start_queue_logging()
+
+
+def worker_exit(server, worker) -> None:
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+def child_exit(server, worker) -> None:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn server running the app in several uvicorn workers.
+
+    The app is imported once before workers are forked. Workers are
+    restarted gracefully after serving a number of requests.
+    """
+
+    def __init__(self, app_uri: str, host: str, port: int,
+                 workers: Optional[int] = None):
+        self.app_uri = app_uri
+        self.options = {
+            "bind": f"{host}:{port}",
+            "workers": workers or settings.WORKERS or available_cores(),
+            "worker_class": f"{__name__}.UvloopWorker",
+            "preload_app": True,
+            "max_requests": settings.WORKER_MAX_REQUESTS,
+            "max_requests_jitter": settings.WORKER_MAX_REQUESTS_JITTER,
+            "graceful_timeout": settings.WORKER_GRACEFUL_TIMEOUT,
+            "keepalive": settings.WORKER_KEEPALIVE,
+            "loglevel": "info",
+            "accesslog": None,
+            "post_worker_init": post_worker_init,
+            "worker_exit": worker_exit,
+            "child_exit": child_exit,
+        }
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Any:
+        return import_from_string(self.app_uri)
@@ -1,9 +1,132 @@
+import asyncio
+import time
+from contextvars import ContextVar
 from typing import Optional
 
-from elasticsearch import AsyncElasticsearch
+from elasticsearch import AsyncElasticsearch, AsyncTransport
+from elasticsearch.exceptions import ConnectionError, TransportError
+
+from src.core.circuit_breaker import CircuitBreaker
+from src.core.config import settings
+from src.core.metrics import ELASTIC_LATENCY, ELASTIC_TOOK
 
 es: Optional[AsyncElasticsearch] = None
 
+# Timeout of every ElasticSearch request made while handling the current
+# request, set by route according to its budget
+elastic_timeout: ContextVar[float] = ContextVar(
+    "elastic_timeout", default=settings.ELASTIC_TIMEOUT
+)
+
+breaker = CircuitBreaker(
+    settings.ELASTIC_BREAKER_FAILURES, settings.ELASTIC_BREAKER_RECOVERY_TIME
+)
+
+
+class ElasticUnavailable(Exception):
+    """ElasticSearch is unavailable, failed or too slow to respond."""
+
+
+class InstrumentedTransport(AsyncTransport):
+    """Transport which guards and records every ElasticSearch request.
+
+    Requests get timeout from the budget of the current route and are
+    rejected at once while the circuit breaker is open.
+    Client side latency is recorded next to the `took` time
+    reported by ElasticSearch, their difference is network and queueing.
+    Requests in flight are counted for connection pool usage metrics.
+    """
+
+    in_flight = 0
+
+    async def perform_request(self, method, url, headers=None, params=None,
+                              body=None):
+        parts = [part for part in url.split("/") if part]
+        operation = next(
+            (part for part in parts if part.startswith("_")), method.lower()
+        )
+        index = parts[0] if parts and not parts[0].startswith("_") else "-"
+        if not breaker.allow_request():
+            raise ElasticUnavailable("circuit breaker is open")
+        params = {"request_timeout": elastic_timeout.get(), **(params or {})}
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            response = await super().perform_request(
+                method, url, headers=headers, params=params, body=body
+            )
+        except ConnectionError as e:
+            breaker.record_failure()
+            raise ElasticUnavailable(str(e)) from e
+        except TransportError as e:
+            if isinstance(e.status_code, int) and e.status_code >= 500:
+                breaker.record_failure()
+                raise ElasticUnavailable(str(e)) from e
+            breaker.record_success()
+            raise
+        finally:
+            self.in_flight -= 1
+            ELASTIC_LATENCY.labels(operation, index).observe(
+                time.perf_counter() - start
+            )
+        breaker.record_success()
+        if isinstance(response, dict) and "took" in response:
+            ELASTIC_TOOK.labels(operation, index).observe(
+                response["took"] / 1000
+            )
+        return response
+
+
+def create_elastic() -> AsyncElasticsearch:
+    """Create ElasticSearch client with configured connection pools."""
+    return AsyncElasticsearch(
+        hosts=[
+            f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}",
+            *settings.ELASTIC_HOSTS,
+        ],
+        transport_class=InstrumentedTransport,
+        maxsize=settings.ELASTIC_POOL_SIZE,
+        timeout=settings.ELASTIC_TIMEOUT,
+        sniff_on_start=settings.ELASTIC_SNIFF,
+        sniff_on_connection_fail=settings.ELASTIC_SNIFF,
+        sniffer_timeout=(
+            settings.ELASTIC_SNIFF_INTERVAL if settings.ELASTIC_SNIFF else None
+        ),
+    )
+
+
+async def warm_elastic(elastic: AsyncElasticsearch, connections: int):
+    """Open the number of connections to every node and verify them."""
+    nodes = len(elastic.transport.connection_pool.connections)
+    results = await asyncio.gather(
+        *(elastic.ping() for _ in range(connections * nodes))
+    )
+    if not all(results):
+        raise ElasticUnavailable("ping failed")
+
+
+def elastic_pool_usage(elastic: AsyncElasticsearch) -> tuple[int, int, int]:
+    """Count connections in use, open and max of all nodes.
+
+    Connections in use are requests in flight, limited by pool size.
+    aiohttp doesn't expose idle connections publicly, so they are
+    counted only while its connector keeps them where expected.
+    """
+    idle = max_size = 0
+    for connection in elastic.transport.connection_pool.connections:
+        session = getattr(connection, "session", None)
+        connector = getattr(session, "connector", None)
+        if connector is None:
+            continue
+        max_size += connector.limit or 0
+        idle_conns = getattr(connector, "_conns", None)
+        if isinstance(idle_conns, dict):
+            idle += sum(map(len, idle_conns.values()))
+    in_use = getattr(elastic.transport, "in_flight", 0)
+    if max_size:
+        in_use = min(in_use, max_size)
+    return in_use, in_use + idle, max_size
+
 
 async def get_elastic() -> AsyncElasticsearch:
     """Get object with connection to ElasticSearch."""
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+
+from src.core.config import settings
+from src.core.metrics import POOL_CONNECTIONS
+from src.db.elastic import elastic_pool_usage, warm_elastic
+from src.db.redis import redis_pool_usage, warm_redis
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_pools(elastic: AsyncElasticsearch, redis: Redis):
+    """Open connections of client pools and verify they work."""
+    await asyncio.gather(
+        warm_elastic(elastic, settings.ELASTIC_POOL_WARM),
+        warm_redis(redis, settings.REDIS_POOL_WARM),
+    )
+
+
+def record_pool_usage(elastic: AsyncElasticsearch, redis: Redis):
+    """Record number of connections of client pools by state."""
+    usages = (
+        ("elastic", elastic_pool_usage(elastic)),
+        ("redis", redis_pool_usage(redis)),
+    )
+    for pool, (in_use, opened, max_size) in usages:
+        POOL_CONNECTIONS.labels(pool, "in_use").set(in_use)
+        POOL_CONNECTIONS.labels(pool, "open").set(opened)
+        POOL_CONNECTIONS.labels(pool, "max").set(max_size)
+
+
+async def watch_pool_usage(elastic: AsyncElasticsearch, redis: Redis):
+    """Record usage of client pools periodically."""
+    while True:
+        try:
+            record_pool_usage(elastic, redis)
+        except Exception:
+            logger.exception("Failed to record pool usage")
+        await asyncio.sleep(settings.POOL_METRICS_INTERVAL)
@@ -1,10 +1,43 @@
+import asyncio
 from typing import Optional
 
-from aioredis import Redis
+from aioredis import BlockingConnectionPool, Redis
+
+from src.core.config import settings
 
 redis: Optional[Redis] = None
 
 
+def create_redis() -> Redis:
+    """Create Redis client with configured connection pool."""
+    pool = BlockingConnectionPool.from_url(
+        f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}",
+        max_connections=settings.REDIS_POOL_SIZE,
+        timeout=settings.REDIS_TIMEOUT,
+        socket_timeout=settings.REDIS_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return Redis(connection_pool=pool)
+
+
+async def warm_redis(redis: Redis, connections: int):
+    """Open the number of connections and verify them."""
+    await asyncio.gather(*(redis.ping() for _ in range(connections)))
+
+
+def redis_pool_usage(redis: Redis) -> tuple[int, int, int]:
+    """Count connections in use, open and max of the pool."""
+    pool = redis.connection_pool
+    # Free connections and placeholders for new ones wait in the queue
+    in_use = pool.max_connections - pool.pool.qsize()
+    # Created connections are not exposed publicly
+    connections = getattr(pool, "_connections", None)
+    opened = len(connections) if connections is not None else in_use
+    return in_use, opened, pool.max_connections
+
+
 async def get_redis() -> Redis:
     """Get object with connection to Redis."""
     return redis
@@ -1,13 +1,27 @@
-import aioredis
-from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI
+import asyncio
+import logging
+from http import HTTPStatus
+
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 
 from src.api.base_router import api_router
 from src.core.config import settings
+from src.core.etag import ConditionalGetMiddleware
+from src.core.metrics import MetricsMiddleware, metrics_response
 from src.db import elastic, redis
+from src.db.elastic import ElasticUnavailable, create_elastic
+from src.db.pools import warm_pools, watch_pool_usage
+from src.db.redis import create_redis
+from src.services.genre import load_genre_catalogue, watch_genre_catalogue
+from src.utils.cache import (ORJSONCoder, ResponseCoder,
+                             canonical_key_builder)
+from src.utils.cache_warmer import (AccessStatsMiddleware, warm_cache,
+                                    watch_cache_warming)
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -17,21 +31,94 @@ app = FastAPI(
 )
 
 app.router.include_router(api_router, prefix="/api/v1")
+app.add_middleware(AccessStatsMiddleware)
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(MetricsMiddleware)
+if settings.PROFILING_TOKEN:
+    from src.core.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+
+app.state.ready = False
+
+background_tasks: list[asyncio.Task] = []
+
+
+@app.exception_handler(ElasticUnavailable)
+async def elastic_unavailable_handler(
+        request: Request, exc: ElasticUnavailable
+) -> ORJSONResponse:
+    """Fail fast while ElasticSearch is unavailable."""
+    return ORJSONResponse(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        content={"detail": "search is temporarily unavailable"},
+        headers={
+            "Retry-After": str(int(settings.ELASTIC_BREAKER_RECOVERY_TIME))
+        },
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Represent metrics of the API in Prometheus format."""
+    return metrics_response()
+
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Report whether the app is started and its connections work."""
+    if not app.state.ready:
+        try:
+            await warm_pools(elastic.es, redis.redis)
+        except Exception:
+            return ORJSONResponse(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                content={"ready": False},
+            )
+        app.state.ready = True
+    return {"ready": True}
 
 
 @app.on_event("startup")
 async def startup():
-    elastic.es = AsyncElasticsearch(
-        hosts=[f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
+    elastic.es = create_elastic()
+    redis.redis = create_redis()
+    FastAPICache.init(
+        RedisBackend(redis.redis),
+        prefix="fastapi-cache",
+        coder=ResponseCoder if settings.CACHE_RESPONSE_BYTES else ORJSONCoder,
+        key_builder=canonical_key_builder,
+    )
+    try:
+        await warm_pools(elastic.es, redis.redis)
+        pools_ready = True
+    except Exception:
+        logger.exception("Connections are not verified, will retry later")
+        pools_ready = False
+    try:
+        await load_genre_catalogue(elastic.es, redis.redis)
+    except Exception:
+        logger.exception("Genre catalogue is not loaded, will retry later")
+    try:
+        await warm_cache(app, redis.redis, "startup")
+    except Exception:
+        logger.exception("Cache is not warmed at startup")
+    background_tasks.append(
+        asyncio.create_task(watch_genre_catalogue(elastic.es, redis.redis))
+    )
+    background_tasks.append(
+        asyncio.create_task(watch_cache_warming(app, redis.redis))
     )
-    redis.redis = aioredis.from_url(
-        f"redis://{settings.REDIS_HOST}",
-        encoding="utf8", decode_responses=True
+    background_tasks.append(
+        asyncio.create_task(watch_pool_usage(elastic.es, redis.redis))
     )
-    FastAPICache.init(RedisBackend(redis.redis), prefix="fastapi-cache")
+    app.state.ready = pools_ready
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    for task in background_tasks:
+        task.cancel()
     await elastic.es.close()
     await redis.redis.close()
+    await redis.redis.connection_pool.disconnect()
@@ -1,3 +1,7 @@
+from typing import Optional
+
+from pydantic import Extra
+
 from .genre import Genre
 from .person import Person
 from .base import Base
@@ -16,4 +20,40 @@ class Movie(Base):
     directors: list[Person]
 
 
+class MovieShort(Base):
+    """Model to represent Movie objects in lists.
+
+    Keeps any other Movie fields requested via sparse fieldset.
+    """
+
+    id: str
+    title: Optional[str]
+    imdb_rating: Optional[float]
+
+    class Config:
+        extra = Extra.allow
+
+
+class GenreFacet(Base):
+    """Model to represent number of movies of the genre."""
+
+    id: str
+    name: Optional[str]
+    count: int
+
+
+class RatingFacet(Base):
+    """Model to represent number of movies in the rating bucket."""
+
+    rating: float
+    count: int
+
+
+class MovieFacets(Base):
+    """Model to represent movies counts by genres and rating buckets."""
+
+    genres: list[GenreFacet]
+    imdb_rating: list[RatingFacet]
+
+
 FIELDS_FOR_SEARCH = ["title", "description", "actors_names", "writers_names"]
@@ -1,6 +1,8 @@
 from datetime import date
 from typing import Optional
 
+from pydantic import Extra
+
 from .base import Base
 
 
@@ -18,3 +20,16 @@ class Person(Base):
     full_name: str
     birth_date: Optional[date]
     related_movies: Optional[list[RelatedPersonMovie]]
+
+
+class PersonShort(Base):
+    """Model to represent Person objects in lists.
+
+    Keeps any other Person fields requested via sparse fieldset.
+    """
+
+    id: str
+    full_name: Optional[str]
+
+    class Config:
+        extra = Extra.allow
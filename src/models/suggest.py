@@ -0,0 +1,9 @@
+from .base import Base
+
+
+class Suggestion(Base):
+    """Model to represent autocomplete suggestion of movie or person."""
+
+    id: str
+    label: str
+    type: str
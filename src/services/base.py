@@ -0,0 +1,128 @@
+from typing import AsyncIterator, Optional
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.exceptions import (NotFoundError, RequestError,
+                                      TransportError)
+
+from src.core.config import settings
+from src.db.elastic import ElasticUnavailable
+from src.utils.query_builder import is_request_cacheable
+from src.utils.utils import (CursorExpired, decode_cursor, encode_cursor,
+                             get_query_hash)
+
+
+class BaseElasticService:
+    """Base service with common helpers for working with ElasticSearch."""
+
+    def __init__(self, elastic: AsyncElasticsearch):
+        self.elastic = elastic
+
+    async def _search(self, index: str, body: dict) -> dict:
+        """Search in ElasticSearch index.
+
+        Size-0 requests are marked to use shard request cache.
+        """
+        params = {}
+        if is_request_cacheable(body):
+            params["request_cache"] = "true"
+        return await self.elastic.search(index=index, body=body, params=params)
+
+    async def _msearch(self, body: list[dict]) -> list[dict]:
+        """Run several searches in one request and get their responses.
+
+        A failed search is reported as an error item of the response,
+        it's raised like a failure of a single search would be.
+        """
+        res = await self.elastic.msearch(body=body)
+        for response in res["responses"]:
+            if "error" not in response:
+                continue
+            status = response.get("status", 500)
+            if status >= 500:
+                raise ElasticUnavailable(str(response["error"]))
+            error = response["error"]
+            raise TransportError(
+                status,
+                error.get("type") if isinstance(error, dict) else error,
+                response,
+            )
+        return res["responses"]
+
+    async def _search_by_cursor(
+            self, index: str, body: dict, cursor: str
+    ) -> tuple[dict, Optional[str]]:
+        """Get next page of hits from ElasticSearch by opaque cursor.
+
+        Pages are taken with `search_after` inside a point in time,
+        so every page costs the same regardless of its depth.
+        An empty cursor opens a new point in time. Raises ValueError for
+        a cursor which is malformed or made for another query, and
+        CursorExpired when its point in time is gone.
+        """
+        query_hash = get_query_hash(body)
+        pit_id, search_after = decode_cursor(cursor, query_hash)
+        if not pit_id:
+            pit_id = await self._open_pit(index)
+        try:
+            res = await self._search_in_pit(pit_id, body, search_after)
+        except NotFoundError:
+            if not cursor:
+                raise
+            raise CursorExpired("cursor expired") from None
+        except RequestError:
+            if not cursor:
+                raise
+            raise ValueError("invalid cursor") from None
+        hits = res["hits"]["hits"]
+        pit_id = res.get("pit_id", pit_id)
+        if len(hits) < body["size"]:
+            await self._close_pit(pit_id)
+            return res, None
+        return res, encode_cursor(pit_id, hits[-1]["sort"], query_hash)
+
+    async def _iterate_by_pit(
+            self, index: str, body: dict
+    ) -> AsyncIterator[list[dict]]:
+        """Iterate over all hits of query by pages inside a point in time.
+
+        Only one page of hits is held in memory at a time.
+        """
+        pit_id = await self._open_pit(index)
+        search_after = None
+        try:
+            while True:
+                res = await self._search_in_pit(pit_id, body, search_after)
+                hits = res["hits"]["hits"]
+                pit_id = res.get("pit_id", pit_id)
+                if hits:
+                    yield hits
+                if len(hits) < body["size"]:
+                    return
+                search_after = hits[-1]["sort"]
+        finally:
+            await self._close_pit(pit_id)
+
+    async def _search_in_pit(
+            self, pit_id: str, body: dict, search_after: Optional[list]
+    ) -> dict:
+        """Search page of hits after `search_after` inside a point in time."""
+        body = {
+            **body,
+            "pit": {
+                "id": pit_id, "keep_alive": settings.ELASTIC_PIT_KEEP_ALIVE
+            },
+        }
+        if search_after:
+            body["search_after"] = search_after
+        return await self.elastic.search(body=body)
+
+    async def _open_pit(self, index: str) -> str:
+        """Open point in time for index and get its id."""
+        pit = await self.elastic.open_point_in_time(
+            index=index, keep_alive=settings.ELASTIC_PIT_KEEP_ALIVE
+        )
+        return pit["id"]
+
+    async def _close_pit(self, pit_id: str) -> None:
+        """Close point in time to free its resources in ElasticSearch."""
+        await self.elastic.close_point_in_time(body={"id": pit_id})
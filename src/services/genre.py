@@ -1,43 +1,170 @@
-from typing import Optional
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Mapping, Optional
 
+import orjson
+from aioredis import Redis
+from aioredis.exceptions import RedisError
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
+from src.core.config import settings
+from src.core.etag import make_etag
 from src.db.elastic import get_elastic
 from src.models.genre import Genre
+from src.services.base import BaseElasticService
+from src.utils.utils import EXPORT_SORT, parse_object, parse_objects
 
+logger = logging.getLogger(__name__)
 
-class GenreService:
+# Key which ETL updates after every finished load of genres
+GENRES_LOADED_KEY = "etl_loaded:genres"
+
+
+@dataclass(frozen=True)
+class GenreCatalogue:
+    """Immutable snapshot of all genres."""
+
+    genres: tuple[dict, ...]
+    by_id: Mapping[str, dict]
+    etag: str
+    version: Optional[bytes]
+    loaded_at: float
+
+    @classmethod
+    def from_genres(
+            cls, genres: list[dict], version: Optional[bytes]
+    ) -> 'GenreCatalogue':
+        """Build catalogue from list of genres data."""
+        genres = sorted(genres, key=itemgetter("name"))
+        return cls(
+            genres=tuple(genres),
+            by_id=MappingProxyType({genre["id"]: genre for genre in genres}),
+            etag=make_etag(orjson.dumps(genres)),
+            version=version,
+            loaded_at=time.monotonic(),
+        )
+
+    def known_ids(self, genre_ids: list[str]) -> list[str]:
+        """Get only ids of existing genres."""
+        return [genre_id for genre_id in genre_ids if genre_id in self.by_id]
+
+
+genre_catalogue: Optional[GenreCatalogue] = None
+
+
+def get_genre_name(genre_id: str) -> Optional[str]:
+    """Get name of genre from genre catalogue if it's loaded."""
+    if genre_catalogue is None:
+        return None
+    genre = genre_catalogue.by_id.get(genre_id)
+    return genre["name"] if genre else None
+
+
+async def filter_known_genres(
+        genre_ids: list[str], redis: Redis
+) -> list[str]:
+    """Drop ids of unknown genres if genre catalogue is loaded.
+
+    Ids are dropped only while the catalogue is of the latest load of
+    genres, otherwise they may be of genres loaded since.
+    """
+    if genre_catalogue is None:
+        return genre_ids
+    known_ids = genre_catalogue.known_ids(genre_ids)
+    if len(known_ids) == len(genre_ids):
+        return known_ids
+    try:
+        version = await redis.get(GENRES_LOADED_KEY)
+    except (RedisError, OSError):
+        return genre_ids
+    if version != genre_catalogue.version:
+        return genre_ids
+    return known_ids
+
+
+class GenreService(BaseElasticService):
     """Service for getting data by Genre."""
-    def __init__(self, elastic: AsyncElasticsearch):
-        self.elastic = elastic
 
-    async def get_by_id(self, genre_id: str) -> Genre:
+    async def get_by_id(self, genre_id: str) -> Optional[dict]:
         """Get Genre data by id."""
+        if genre_catalogue:
+            return genre_catalogue.by_id.get(genre_id)
         genre = await self._get_genre_from_elastic(genre_id)
         return genre
 
-    async def _get_genre_from_elastic(self, genre_id: str) -> Genre:
+    async def _get_genre_from_elastic(
+            self, genre_id: str
+    ) -> Optional[dict]:
         """Get Genre data by id from ElasticSearch."""
         if not await self.elastic.exists('genres', genre_id):
             return None
-        genre_data = await self.elastic.get('genres', genre_id)
-        return Genre(**genre_data['_source'])
+        genre_data = await self.elastic.get(
+            'genres', genre_id, _source_includes=list(Genre.__fields__)
+        )
+        return parse_object(genre_data['_source'], Genre)
 
-    async def get_all(self) -> Optional[list[Genre]]:
+    def get_etag(self) -> Optional[str]:
+        """Get ETag of genres, which changes with any of them."""
+        return genre_catalogue.etag if genre_catalogue else None
+
+    async def get_all(self) -> list[dict]:
         """Get all Genres data."""
+        if genre_catalogue:
+            return list(genre_catalogue.genres)
         genres = await self._get_genres_from_elastic()
         return genres
 
-    async def _get_genres_from_elastic(self) -> Optional[list[Genre]]:
+    async def _get_genres_from_elastic(self) -> list[dict]:
         """Get all Genres data from ElasticSearch."""
-        genres_data = await self.elastic.search(index='genres')
-        genres = [
-            Genre(**genre_data['_source'])
-            for genre_data in genres_data['hits']['hits']
-        ]
+        genres = []
+        body = {
+            "size": settings.ELASTIC_EXPORT_BATCH_SIZE,
+            "_source": list(Genre.__fields__),
+            "sort": EXPORT_SORT,
+        }
+        async for hits in self._iterate_by_pit('genres', body):
+            genres += parse_objects({"hits": {"hits": hits}}, Genre)
         return genres
 
+    async def load_catalogue(
+            self, version: Optional[bytes] = None
+    ) -> GenreCatalogue:
+        """Load catalogue of all genres from ElasticSearch."""
+        genres = await self._get_genres_from_elastic()
+        return GenreCatalogue.from_genres(genres, version)
+
+
+async def load_genre_catalogue(elastic: AsyncElasticsearch, redis: Redis):
+    """Load catalogue of all genres to memory."""
+    global genre_catalogue
+    version = await redis.get(GENRES_LOADED_KEY)
+    genre_catalogue = await GenreService(elastic).load_catalogue(version)
+    logger.info(
+        "Genre catalogue loaded: %d genres", len(genre_catalogue.genres)
+    )
+
+
+async def watch_genre_catalogue(elastic: AsyncElasticsearch, redis: Redis):
+    """Reload genre catalogue after ETL loads genres or when it's too old."""
+    while True:
+        await asyncio.sleep(settings.GENRES_CHECK_INTERVAL)
+        try:
+            version = await redis.get(GENRES_LOADED_KEY)
+            if (
+                genre_catalogue is None
+                or genre_catalogue.version != version
+                or time.monotonic() - genre_catalogue.loaded_at
+                > settings.GENRES_MAX_AGE
+            ):
+                await load_genre_catalogue(elastic, redis)
+        except Exception:
+            logger.exception("Failed to reload genre catalogue")
+
 
 async def get_genre_service(
         elastic: AsyncElasticsearch = Depends(get_elastic)
@@ -1,68 +1,268 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
+import orjson
+from aioredis import Redis
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
+from src.core.config import settings
 from src.db.elastic import get_elastic
-from src.models.movie import Movie
-from src.utils.utils import (get_genres_filter_for_elastic,
-                             get_movies_sorting_for_elastic,
-                             get_search_body_for_movies, parse_objects)
+from src.db.redis import get_redis
+from src.models.movie import Movie, MovieShort
+from src.services.base import BaseElasticService
+from src.services.genre import filter_known_genres, get_genre_name
+from src.utils.query_builder import MovieQuery
+from src.utils.utils import (EXPORT_SORT, hits_to_ndjson, parse_object,
+                             parse_objects)
 
+# Sorted sets of movie ids by rating and hash of their short documents,
+# which ETL maintains, and its signal that the sets hold all movies
+TOP_RATED_KEY = "top_rated:movies"
+TOP_RATED_GENRE_KEY = "top_rated:genre:{genre_id}"
+# Sets scored by negated rating for descending listings, so ties go by id
+# ascending like in ElasticSearch
+TOP_RATED_DESC_KEY = "top_rated:movies:desc"
+TOP_RATED_GENRE_DESC_KEY = "top_rated:genre:{genre_id}:desc"
+TOP_RATED_DOCS_KEY = "top_rated:docs"
+TOP_RATED_COMPLETE_KEY = "top_rated:complete"
+TOP_RATED_FIELDS = {"id", "title", "imdb_rating"}
+TOP_RATED_SORTS = {"imdb_rating", "-imdb_rating"}
 
-class MovieService:
+
+class MovieService(BaseElasticService):
     """Service for getting data for movie."""
 
-    def __init__(self, elastic: AsyncElasticsearch):
-        self.elastic = elastic
+    def __init__(self, elastic: AsyncElasticsearch, redis: Redis):
+        super().__init__(elastic)
+        self.redis = redis
 
-    async def get_by_id(self, movie_id: str) -> Optional[Movie]:
+    async def get_by_id(self, movie_id: str) -> Optional[dict]:
         """Get movie data by id."""
         return await self._get_movie_from_elastic(movie_id)
 
     async def get_all(
             self, page: int, size: int,
-            sort: Optional[str], genres: Optional[str]
+            sort: Optional[str], genres: Optional[str], fields: list[str]
     ):
         """Get all movies data with optional filters."""
-        return await self._get_movies_from_elastic(page, size, sort, genres)
+        query = await self._get_listing_query(sort, genres)
+        if query is None:
+            return []
+        movies = None
+        if settings.MOVIES_LISTING_FROM_REDIS:
+            movies = await self._get_movies_from_redis(
+                query, page, size, fields
+            )
+        if movies is None:
+            movies = await self._get_movies_from_elastic(
+                query, page, size, fields
+            )
+        return movies
+
+    async def get_all_by_cursor(
+            self, cursor: str, size: int, sort: Optional[str],
+            genres: Optional[list[str]], fields: list[str]
+    ) -> tuple[list[dict], Optional[str]]:
+        """Get page of all movies after cursor and cursor for next page."""
+        query = await self._get_listing_query(sort, genres)
+        if query is None:
+            return [], None
+        body = query.get_body(size, fields)
+        res, next_cursor = await self._search_by_cursor(
+            "movies", body, cursor
+        )
+        return parse_objects(res, MovieShort), next_cursor
 
     async def _get_movies_from_elastic(
-            self, page: int, size: int,
-            sort: Optional[str], genres: Optional[list[str]]
-    ):
+            self, query: MovieQuery, page: int, size: int, fields: list[str]
+    ) -> list[dict]:
         """Get movies from ElasticSearch with optional filters."""
-        body = {"size": size, "from": (page - 1) * size}
-        if sort:
-            body.update(get_movies_sorting_for_elastic(sort))
+        body = query.get_body(size, fields)
+        body["from"] = (page - 1) * size
+        res = await self._search("movies", body)
+        return parse_objects(res, MovieShort)
+
+    async def _get_movies_from_redis(
+            self, query: MovieQuery, page: int, size: int, fields: list[str]
+    ) -> Optional[list[dict]]:
+        """Get page of movies sorted by rating from sets ETL keeps in Redis.
+
+        Only listings of all movies or of a single genre are kept. None is
+        returned when the page can't be served from the sets.
+        """
+        if (
+            query.sort not in TOP_RATED_SORTS
+            or len(query.genres) > 1
+            or not TOP_RATED_FIELDS.issuperset(fields)
+        ):
+            return None
+        descending = query.sort.startswith("-")
+        key = TOP_RATED_DESC_KEY if descending else TOP_RATED_KEY
+        if query.genres:
+            key = (
+                TOP_RATED_GENRE_DESC_KEY if descending else TOP_RATED_GENRE_KEY
+            ).format(genre_id=query.genres[0])
+        start = (page - 1) * size
+        stop = start + size - 1
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(TOP_RATED_COMPLETE_KEY)
+            pipe.zcard(key)
+            pipe.zrange(key, start, stop)
+            is_complete, rated_count, movie_ids = await pipe.execute()
+        # Movies without rating follow rated ones and are not in the sets
+        if not is_complete or stop >= rated_count:
+            return None
+        docs = await self.redis.hmget(TOP_RATED_DOCS_KEY, movie_ids)
+        if None in docs:
+            return None
+        return [
+            {field: doc[field] for field in fields if field in doc}
+            for doc in map(orjson.loads, docs)
+        ]
+
+    async def _get_listing_query(
+            self,
+            sort: Optional[str] = None,
+            genres: Optional[list[str]] = None,
+            search: Optional[str] = None,
+    ) -> Optional[MovieQuery]:
+        """Get query for movies listing, None if it can't match anything."""
         if genres:
-            body.update(get_genres_filter_for_elastic(genres))
-        res = await self.elastic.search(index="movies", body=body)
-        return parse_objects(res, Movie)
+            genres = await filter_known_genres(genres, self.redis)
+            if not genres:
+                return None
+        return MovieQuery.create(search=search, genres=genres, sort=sort)
+
+    async def get_facets(
+            self, search: Optional[str], genres: Optional[list[str]]
+    ) -> dict:
+        """Get movies counts by genres and rating buckets."""
+        query = await self._get_listing_query(genres=genres, search=search)
+        if query is None:
+            return {"genres": [], "imdb_rating": []}
+        return await self._get_facets_from_elastic(query)
+
+    async def _get_facets_from_elastic(self, query: MovieQuery) -> dict:
+        """Get movies facets from ElasticSearch in one aggregation query.
 
-    async def search_movies(self, page: int, size: int, query: str):
+        Genre counts are taken from `reverse_nested`, so they count movies
+        rather than nested genre entries.
+        """
+        body = query.get_aggregations_body(
+            {
+                "genres": {
+                    "nested": {"path": "genres"},
+                    "aggs": {
+                        "ids": {
+                            "terms": {
+                                "field": "genres.id",
+                                "size": settings.FACETS_GENRES_SIZE,
+                                "order": {"movies": "desc"},
+                            },
+                            "aggs": {"movies": {"reverse_nested": {}}},
+                        }
+                    },
+                },
+                "imdb_rating": {
+                    "histogram": {
+                        "field": "imdb_rating",
+                        "interval": settings.FACETS_RATING_INTERVAL,
+                    }
+                },
+            }
+        )
+        res = await self._search("movies", body)
+        aggregations = res["aggregations"]
+        return {
+            "genres": [
+                {
+                    "id": bucket["key"],
+                    "name": get_genre_name(bucket["key"]),
+                    "count": bucket["movies"]["doc_count"],
+                }
+                for bucket in aggregations["genres"]["ids"]["buckets"]
+            ],
+            "imdb_rating": [
+                {"rating": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in aggregations["imdb_rating"]["buckets"]
+            ],
+        }
+
+    async def search_movies(
+            self, page: int, size: int, query: str, fields: list[str]
+    ):
         """Find movies by specific query."""
-        movies = await self._search_movie_in_elastic(page, size, query)
+        movies = await self._search_movie_in_elastic(
+            page, size, query, fields
+        )
         return movies
 
+    async def search_movies_by_cursor(
+            self, cursor: str, size: int, query: str, fields: list[str]
+    ) -> tuple[list[dict], Optional[str]]:
+        """Find page of movies after cursor and cursor for next page."""
+        body = MovieQuery.create(search=query).get_body(size, fields)
+        res, next_cursor = await self._search_by_cursor(
+            "movies", body, cursor
+        )
+        return parse_objects(res, MovieShort), next_cursor
+
     async def _search_movie_in_elastic(
-            self, page: int, size: int, query: str
-    ) -> list[Optional[Movie]]:
+            self, page: int, size: int, query: str, fields: list[str]
+    ) -> list[dict]:
         """Search movies in ElasticSearch by specific query."""
-        body = {"size": size, "from": (page - 1) * size}
-        body.update(get_search_body_for_movies(query))
-        res = await self.elastic.search(index="movies", body=body)
-        return parse_objects(res, Movie)
+        body = MovieQuery.create(search=query).get_body(size, fields)
+        body["from"] = (page - 1) * size
+        res = await self._search("movies", body)
+        return parse_objects(res, MovieShort)
+
+    async def export(self, fields: list[str]) -> AsyncIterator[bytes]:
+        """Export all movies as chunks of newline delimited JSON."""
+        body = {
+            "size": settings.ELASTIC_EXPORT_BATCH_SIZE,
+            "_source": fields,
+            "sort": EXPORT_SORT,
+        }
+        async for hits in self._iterate_by_pit("movies", body):
+            yield hits_to_ndjson(hits, Movie)
+
+    async def get_similar(
+            self, movie_id: str, fields: list[str]
+    ) -> Optional[list[dict]]:
+        """Get movies similar to the movie, None if it's not found.
+
+        Ids of similar movies are found by ETL and stored on the movie,
+        so they are fetched in a single multi get.
+        """
+        movie_data = await self.elastic.get(
+            "movies", movie_id, _source_includes=["similar_ids"], ignore=404
+        )
+        if not movie_data.get("found"):
+            return None
+        similar_ids = movie_data["_source"].get("similar_ids")
+        if not similar_ids:
+            return []
+        res = await self.elastic.mget(
+            body={"ids": similar_ids}, index="movies", _source_includes=fields
+        )
+        return [
+            parse_object(doc["_source"], MovieShort)
+            for doc in res["docs"] if doc.get("found")
+        ]
 
-    async def _get_movie_from_elastic(self, movie_id: str) -> Optional[Movie]:
+    async def _get_movie_from_elastic(self, movie_id: str) -> Optional[dict]:
         """Get movie data from ElasticSearch."""
         if not await self.elastic.exists("movies", movie_id):
             return None
-        movie_data = await self.elastic.get("movies", movie_id)
-        return Movie(**movie_data["_source"])
+        movie_data = await self.elastic.get(
+            "movies", movie_id, _source_includes=list(Movie.__fields__)
+        )
+        return parse_object(movie_data["_source"], Movie)
 
 
 def get_movie_service(
-        elastic: AsyncElasticsearch = Depends(get_elastic)) -> MovieService:
+        elastic: AsyncElasticsearch = Depends(get_elastic),
+        redis: Redis = Depends(get_redis),
+) -> MovieService:
     """Get a service for working with Movie data"""
-    return MovieService(elastic)
+    return MovieService(elastic, redis)
@@ -1,75 +1,139 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import Depends
 
+from src.core.config import settings
 from src.db.elastic import get_elastic
-from src.models.movie import Movie
-from src.models.person import Person
-from src.utils.utils import parse_objects
+from src.models.movie import MovieShort
+from src.models.person import Person, PersonShort
+from src.services.base import BaseElasticService
+from src.utils.query_builder import MovieQuery
+from src.utils.utils import (EXPORT_SORT, TIEBREAKER_SORT, hits_to_ndjson,
+                             parse_object, parse_objects)
 
 
-class PersonService:
+class PersonService(BaseElasticService):
     """Service for getting data by Person."""
 
-    def __init__(self, elastic: AsyncElasticsearch):
-        self.elastic = elastic
-
-    async def get_by_id(self, person_id: str) -> Optional[Person]:
+    async def get_by_id(self, person_id: str) -> Optional[dict]:
         """Get person data by id."""
         person = await self._get_person_from_elastic(person_id)
         return person
 
     async def _get_person_from_elastic(
             self, person_id: str
-    ) -> Optional[Person]:
+    ) -> Optional[dict]:
         """Get person data from ElasticSearch."""
         if not await self.elastic.exists("persons", person_id):
             return None
-        person_data = await self.elastic.get("persons", person_id)
-        return Person(**person_data["_source"])
+        person_data = await self.elastic.get(
+            "persons", person_id, _source_includes=list(Person.__fields__)
+        )
+        return parse_object(person_data["_source"], Person)
 
     async def get_person_movies(
-            self, page: int, size: int, person_id: str
-    ) -> Optional[list[Movie]]:
+            self, page: int, size: int, person_id: str, fields: list[str]
+    ) -> Optional[list[dict]]:
         """Get all person movies data."""
-        person = await self._get_person_from_elastic(person_id)
-        if not person:
-            return None
-        person_movie_ids = [movie.id for movie in person.related_movies]
         return await self._get_person_movies_from_elastic(
-            page, size, person_movie_ids
+            page, size, person_id, fields
         )
 
+    async def get_person_movies_by_cursor(
+            self, cursor: str, size: int, person_id: str, fields: list[str]
+    ) -> tuple[Optional[list[dict]], Optional[str]]:
+        """Get page of person movies after cursor and cursor for next page.
+
+        Movies of unknown person are None, as in `get_person_movies`.
+        """
+        if not await self.elastic.exists("persons", person_id):
+            return None, None
+        body = self._get_person_movies_body(size, person_id, fields)
+        res, next_cursor = await self._search_by_cursor(
+            "movies", body, cursor
+        )
+        return parse_objects(res, MovieShort), next_cursor
+
     async def _get_person_movies_from_elastic(
-            self, page: int, size: int, movie_ids: list[str]
-    ) -> list[Movie]:
-        """Get all person movies data from ElasticSearch."""
-        body = {
-            "size": size, "from": (page - 1) * size,
-            "query": {"ids": {"values": movie_ids}}
+            self, page: int, size: int, person_id: str, fields: list[str]
+    ) -> Optional[list[dict]]:
+        """Get all person movies data from ElasticSearch.
+
+        Person existence check and movies search go in one multi search
+        request, so the whole page takes a single round trip.
+        """
+        body = self._get_person_movies_body(size, person_id, fields)
+        body["from"] = (page - 1) * size
+        person_exists_body = {
+            "size": 0, "query": {"ids": {"values": [person_id]}}
         }
-        person_movies_data = await self.elastic.search(
-            index="movies", body=body
+        person_data, person_movies_data = await self._msearch(
+            [
+                {"index": "persons"}, person_exists_body,
+                {"index": "movies"}, body,
+            ]
         )
-        return parse_objects(person_movies_data, Movie)
+        if not person_data["hits"]["total"]["value"]:
+            return None
+        return parse_objects(person_movies_data, MovieShort)
+
+    @staticmethod
+    def _get_person_movies_body(
+            size: int, person_id: str, fields: list[str]
+    ) -> dict:
+        """Get body of query to ElasticSearch for person movies."""
+        query = MovieQuery.create(person_id=person_id, sort="-imdb_rating")
+        return query.get_body(size, fields)
 
     async def search_persons(
-            self, page: int, size: int, query: str
-    ) -> list[Person]:
+            self, page: int, size: int, query: str, fields: list[str]
+    ) -> list[dict]:
         """Find persons by specific query."""
-        return await self._search_persons_from_elastic(page, size, query)
+        return await self._search_persons_from_elastic(
+            page, size, query, fields
+        )
+
+    async def search_persons_by_cursor(
+            self, cursor: str, size: int, query: str, fields: list[str]
+    ) -> tuple[list[dict], Optional[str]]:
+        """Find page of persons after cursor and cursor for next page."""
+        body = self._get_search_persons_body(size, query, fields)
+        res, next_cursor = await self._search_by_cursor(
+            "persons", body, cursor
+        )
+        return parse_objects(res, PersonShort), next_cursor
 
     async def _search_persons_from_elastic(
-            self, page: int, size: int, query: str
-    ) -> list[Person]:
+            self, page: int, size: int, query: str, fields: list[str]
+    ) -> list[dict]:
         """Search persons in ElasticSearch by specific query."""
+        body = self._get_search_persons_body(size, query, fields)
+        body["from"] = (page - 1) * size
+        persons_data = await self._search("persons", body)
+        return parse_objects(persons_data, PersonShort)
+
+    @staticmethod
+    def _get_search_persons_body(
+            size: int, query: str, fields: list[str]
+    ) -> dict:
+        """Get body of query to ElasticSearch for persons search."""
+        return {
+            "size": size,
+            "_source": fields,
+            "query": {"match": {"full_name": {"query": query}}},
+            "sort": [{"_score": {"order": "desc"}}, TIEBREAKER_SORT],
+        }
+
+    async def export(self, fields: list[str]) -> AsyncIterator[bytes]:
+        """Export all persons as chunks of newline delimited JSON."""
         body = {
-            "size": size, "from": (page - 1) * size,
-            "query": {"match": {"full_name": {"query": query}}}
+            "size": settings.ELASTIC_EXPORT_BATCH_SIZE,
+            "_source": fields,
+            "sort": EXPORT_SORT,
         }
-        persons_data = await self.elastic.search(index="persons", body=body)
-        return parse_objects(persons_data, Person)
+        async for hits in self._iterate_by_pit("persons", body):
+            yield hits_to_ndjson(hits, Person)
 
 
 def get_person_service(
@@ -0,0 +1,65 @@
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from src.db.elastic import get_elastic
+from src.services.base import BaseElasticService
+from src.utils.query_builder import normalize_search_text
+
+# Index, completion field and label field of suggested objects by type
+SUGGEST_SOURCES = {
+    "movie": ("movies", "title_suggest", "title"),
+    "person": ("persons", "full_name_suggest", "full_name"),
+}
+
+
+class SuggestService(BaseElasticService):
+    """Service for autocomplete of movie titles and person names."""
+
+    async def suggest(self, prefix: str, size: int) -> list[dict]:
+        """Get movies and persons which labels start with prefix."""
+        prefix = normalize_search_text(prefix)
+        if not prefix:
+            return []
+        return await self._suggest_from_elastic(prefix, size)
+
+    async def _suggest_from_elastic(
+            self, prefix: str, size: int
+    ) -> list[dict]:
+        """Get suggestions from completion fields in one multi search."""
+        body = []
+        for index, field, label in SUGGEST_SOURCES.values():
+            body += [
+                {"index": index},
+                {
+                    # Only suggestions are needed, not hits of the query
+                    "size": 0,
+                    "_source": [label],
+                    "suggest": {
+                        "suggestion": {
+                            "prefix": prefix,
+                            "completion": {"field": field, "size": size},
+                        }
+                    },
+                },
+            ]
+        responses = await self._msearch(body)
+        suggestions = []
+        for (suggest_type, (_, _, label)), suggest_data in zip(
+                SUGGEST_SOURCES.items(), responses
+        ):
+            for option in suggest_data["suggest"]["suggestion"][0]["options"]:
+                suggestions.append(
+                    {
+                        "id": option["_id"],
+                        "label": option["_source"][label],
+                        "type": suggest_type,
+                    }
+                )
+        return suggestions
+
+
+def get_suggest_service(
+        elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> SuggestService:
+    """Get a service for autocomplete."""
+    return SuggestService(elastic)
@@ -0,0 +1,315 @@
+import hashlib
+import inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from typing import Any, Callable, Optional, Type, Union
+
+import orjson
+from fastapi.params import Param
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import Coder
+from pydantic.json import pydantic_encoder
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from src.core.config import settings
+from src.core.etag import make_etag
+from src.core.metrics import CACHE_BACKEND_LATENCY, CACHE_REQUESTS
+from src.db.elastic import ElasticUnavailable
+from src.utils.compression import (IDENTITY, choose_encoding,
+                                   compress_variants)
+from src.utils.query_builder import normalize_search_text
+
+# Full text parameters of routes which normalize it before querying,
+# so the text is normalized for their cache keys too
+SEARCH_TEXT_PARAMS = {
+    "get_movies": "search",
+    "get_movies_facets": "search",
+    "get_suggestions": "prefix",
+}
+KEY_PARAM_TYPES = (str, int, float, bool, list, tuple)
+# Header with cache lookup result: hit, miss or stale
+CACHE_STATUS_HEADER = "X-Cache"
+
+_refresh_cache: ContextVar[bool] = ContextVar("refresh_cache", default=False)
+# Holder which a caller fills with cache key of the route result
+_cache_key_holder: ContextVar[Optional[dict]] = ContextVar(
+    "cache_key_holder", default=None
+)
+
+
+class ORJSONCoder(Coder):
+    """Coder to store route results in cache as JSON.
+
+    Responses already rendered by routes are stored as their body.
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, Response):
+            return value.body
+        return orjson.dumps(value, default=pydantic_encoder)
+
+    @classmethod
+    def decode(cls, value: Union[str, bytes]) -> Any:
+        return orjson.loads(value)
+
+
+class CachedResponse(Response):
+    """Cached response with body variants compressed in advance.
+
+    The variant is chosen by Accept-Encoding of the request when
+    the response is sent.
+    """
+
+    def __init__(
+            self,
+            data: bytes,
+            variants: dict[str, tuple[int, int]],
+            status_code: int,
+            headers: dict,
+    ):
+        start, end = variants[IDENTITY]
+        super().__init__(data[start:end], status_code, headers)
+        self.data = data
+        self.variants = variants
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if len(self.variants) > 1:
+            encoding = choose_encoding(
+                Headers(scope=scope).get("accept-encoding", ""),
+                self.variants,
+            )
+            self.headers["Vary"] = "Accept-Encoding"
+            if encoding != IDENTITY:
+                start, end = self.variants[encoding]
+                self.body = self.data[start:end]
+                self.headers["Content-Encoding"] = encoding
+                self.headers["Content-Length"] = str(len(self.body))
+                # Strong ETag differs between encodings of the same body
+                etag = self.headers.get("etag")
+                if etag:
+                    self.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        await super().__call__(scope, receive, send)
+
+
+class ResponseCoder(Coder):
+    """Coder to store rendered responses in cache as bytes.
+
+    Entry is a JSON line with status code, headers and sizes of body
+    variants followed by the variants: the body itself and its compressed
+    versions. A cache hit is sent as is without decoding the body.
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if not isinstance(value, Response):
+            value = Response(
+                ORJSONCoder.encode(value), media_type="application/json"
+            )
+        variants = {IDENTITY: value.body}
+        if "content-encoding" not in value.headers:
+            variants.update(compress_variants(value.body))
+        meta = {
+            "status_code": value.status_code,
+            "headers": dict(value.headers),
+            "sizes": {
+                encoding: len(body) for encoding, body in variants.items()
+            },
+        }
+        return b"\n".join([orjson.dumps(meta), *variants.values()])
+
+    @classmethod
+    def decode(cls, value: bytes) -> Response:
+        meta, data = value.split(b"\n", 1)
+        meta = orjson.loads(meta)
+        variants = {}
+        start = 0
+        sizes = meta.get("sizes", {IDENTITY: len(data)})
+        for encoding, size in sizes.items():
+            variants[encoding] = (start, start + size)
+            start += size + 1
+        return CachedResponse(
+            data, variants, meta["status_code"], meta["headers"]
+        )
+
+
+def cache(
+        expire: Optional[int] = None,
+        skip_if: Optional[Callable[..., bool]] = None,
+        namespace: str = "",
+        coder: Optional[Type[Coder]] = None,
+        key_builder: Optional[Callable[..., str]] = None,
+):
+    """Cache route result in the backend configured for `FastAPICache`.
+
+    Calls for which `skip_if` returns True go straight to the route.
+    Within `refresh_cache()` context cached values are not read but
+    replaced with fresh results. Expired values are kept for a while and
+    served when the route fails because ElasticSearch is unavailable.
+    Rendered responses get ETag from hash of the body, which is stored
+    with them, so conditional requests are answered without the body.
+    """
+    def wrapper(func):
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            route = func.__name__
+            if skip_if is not None and skip_if(**kwargs):
+                CACHE_REQUESTS.labels(route, "skip").inc()
+                return await func(*args, **kwargs)
+            route_expire = expire or FastAPICache.get_expire() or 0
+            stale_ttl = get_stale_ttl(route_expire)
+            route_coder = coder or FastAPICache.get_coder()
+            build_key = key_builder or FastAPICache.get_key_builder()
+            backend = FastAPICache.get_backend()
+            cache_key = build_key(func, namespace, args=args, kwargs=kwargs)
+            holder = _cache_key_holder.get()
+            if holder is not None:
+                holder["key"] = cache_key
+            cached = None
+            if _refresh_cache.get():
+                CACHE_REQUESTS.labels(route, "refresh").inc()
+            else:
+                with CACHE_BACKEND_LATENCY.labels("get").time():
+                    ttl, cached = await backend.get_with_ttl(cache_key)
+                # Entries are kept for stale_ttl after they expire
+                if cached is not None and (ttl < 0 or ttl > stale_ttl):
+                    CACHE_REQUESTS.labels(route, "hit").inc()
+                    return _set_cache_status(
+                        route_coder.decode(cached), "hit"
+                    )
+            try:
+                result = await func(*args, **kwargs)
+            except ElasticUnavailable:
+                if cached is None:
+                    raise
+                CACHE_REQUESTS.labels(route, "stale").inc()
+                return _set_cache_status(
+                    route_coder.decode(cached), "stale"
+                )
+            CACHE_REQUESTS.labels(route, "miss").inc()
+            if isinstance(result, Response):
+                result.headers["ETag"] = make_etag(result.body)
+            encoded = route_coder.encode(result)
+            with CACHE_BACKEND_LATENCY.labels("set").time():
+                await backend.set(
+                    cache_key, encoded, route_expire + stale_ttl or None
+                )
+            if issubclass(route_coder, ResponseCoder):
+                # Send the same compressed variants as cache hits do
+                result = route_coder.decode(encoded)
+            return _set_cache_status(result, "miss")
+
+        return inner
+
+    return wrapper
+
+
+def get_stale_ttl(expire: int) -> int:
+    """Get how long an entry is kept after it expires, in proportion to
+    its expire time, so short-lived entries don't linger for long."""
+    return min(
+        settings.CACHE_STALE_TTL, int(expire * settings.CACHE_STALE_RATIO)
+    )
+
+
+def _set_cache_status(result: Any, status: str) -> Any:
+    """Tell in headers of response whether it's served from cache."""
+    if isinstance(result, Response):
+        result.headers[CACHE_STATUS_HEADER] = status
+        if status == "stale":
+            result.headers["Warning"] = '110 - "Response is Stale"'
+    return result
+
+
+@contextmanager
+def refresh_cache():
+    """Replace cached route results with fresh ones within the context."""
+    token = _refresh_cache.set(True)
+    try:
+        yield
+    finally:
+        _refresh_cache.reset(token)
+
+
+@contextmanager
+def track_cache_key():
+    """Get holder of cache key of the route result cached in the context.
+
+    The holder stays empty for routes which are not cached or skip it.
+    """
+    holder = {}
+    token = _cache_key_holder.set(holder)
+    try:
+        yield holder
+    finally:
+        _cache_key_holder.reset(token)
+
+
+def has_cursor(**kwargs) -> bool:
+    """Check whether route is called in cursor pagination mode.
+
+    Cursor pages live inside a point in time, so caching them is useless.
+    """
+    return kwargs.get("cursor") is not None
+
+
+@lru_cache(maxsize=None)
+def _get_param_defaults(func: Callable) -> dict[str, Any]:
+    """Get default values of route parameters."""
+    defaults = {}
+    for name, param in inspect.signature(func).parameters.items():
+        default = param.default
+        if isinstance(default, Param):
+            default = default.default
+        if default is not inspect.Parameter.empty and default is not ...:
+            defaults[name] = default
+    return defaults
+
+
+def _normalize_param(route: str, name: str, value: Any) -> Any:
+    """Get canonical form of route parameter value."""
+    if SEARCH_TEXT_PARAMS.get(route) == name and isinstance(value, str):
+        return normalize_search_text(value)
+    if isinstance(value, (list, tuple)):
+        return sorted(set(value))
+    return value
+
+
+def canonical_key_builder(
+        func: Callable,
+        namespace: Optional[str] = "",
+        request: Optional[Request] = None,
+        response: Optional[Response] = None,
+        args: Optional[tuple] = None,
+        kwargs: Optional[dict] = None,
+) -> str:
+    """Build cache key from canonical form of route parameters.
+
+    Search text of routes in `SEARCH_TEXT_PARAMS` is normalized
+    the same way their queries are, multi-valued parameters are sorted and
+    parameters equal to their defaults are dropped, so equivalent
+    requests share one cache entry. Dependencies such as services
+    are not part of the key.
+    """
+    defaults = _get_param_defaults(func)
+    params = {}
+    for name, value in (kwargs or {}).items():
+        if value is not None and not isinstance(value, KEY_PARAM_TYPES):
+            continue
+        value = _normalize_param(func.__name__, name, value)
+        if name in defaults and value == _normalize_param(
+                func.__name__, name, defaults[name]
+        ):
+            continue
+        params[name] = value
+    params_hash = hashlib.md5(
+        orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    return (
+        f"{FastAPICache.get_prefix()}:{namespace}:"
+        f"{func.__module__}:{func.__name__}:{params_hash}"
+    )
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from typing import Optional
+
+from aioredis import Redis
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import settings
+from src.utils.cache import refresh_cache, track_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Request counts by cache key and paths to replay the keys
+ACCESS_STATS_KEY = "cache-stats:requests:{day}"
+ACCESS_PATHS_KEY = "cache-stats:paths:{day}"
+# Keys which ETL updates after every finished load, see etl/state_storage.py
+ETL_LOADED_KEYS = ("etl_loaded:movies", "etl_loaded:persons")
+CACHE_WARM_LOCK_KEY = "cache-warmer:lock:{name}"
+
+
+class AccessStats:
+    """Counter of requests to cached routes, periodically flushed to Redis.
+
+    Requests are counted by cache key, so equivalent requests count as one
+    entry, and a path of the first of them is kept to replay it.
+    Counts are kept per day, so popularity follows recent traffic.
+    """
+
+    def __init__(self):
+        self.counter = Counter()
+        self.paths = {}
+
+    def record(self, cache_key: str, path: str) -> None:
+        self.counter[cache_key] += 1
+        self.paths.setdefault(cache_key, path)
+
+    async def flush(self, redis: Redis) -> None:
+        """Add collected counts to today's statistics in Redis."""
+        counter, self.counter = self.counter, Counter()
+        paths, self.paths = self.paths, {}
+        if not counter:
+            return
+        day = date.today().isoformat()
+        key = ACCESS_STATS_KEY.format(day=day)
+        paths_key = ACCESS_PATHS_KEY.format(day=day)
+        expire = int(timedelta(days=2).total_seconds())
+        async with redis.pipeline(transaction=False) as pipe:
+            for cache_key, count in counter.items():
+                pipe.zincrby(key, count, cache_key)
+            pipe.hset(paths_key, mapping=paths)
+            pipe.expire(key, expire)
+            pipe.expire(paths_key, expire)
+            await pipe.execute()
+
+    @staticmethod
+    async def get_top(redis: Redis, count: int) -> list[str]:
+        """Get paths of the most requested keys of today and yesterday."""
+        today = date.today()
+        days = [day.isoformat() for day in (today, today - timedelta(1))]
+        scores = Counter()
+        for day in days:
+            key = ACCESS_STATS_KEY.format(day=day)
+            for cache_key, score in await redis.zrevrange(
+                    key, 0, count - 1, withscores=True
+            ):
+                scores[cache_key] += score
+        top = [cache_key for cache_key, _ in scores.most_common(count)]
+        paths = {}
+        for day in days:
+            if not top:
+                break
+            day_paths = await redis.hmget(
+                ACCESS_PATHS_KEY.format(day=day), top
+            )
+            for cache_key, path in zip(top, day_paths):
+                if path and cache_key not in paths:
+                    paths[cache_key] = path.decode()
+        return [paths[cache_key] for cache_key in top if cache_key in paths]
+
+
+access_stats = AccessStats()
+
+
+class AccessStatsMiddleware:
+    """Middleware to count successful GET requests to cached API routes.
+
+    Requests which are not cached, like exports and cursor pages, are
+    not counted, since warming them is useless.
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str = "/api/"):
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "GET"
+            or not scope["path"].startswith(self.path_prefix)
+            or scope.get("cache_warmer")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] == 200
+                and "key" in cache_key
+            ):
+                path = scope["path"]
+                if scope["query_string"]:
+                    path += "?" + scope["query_string"].decode("latin-1")
+                access_stats.record(cache_key["key"], path)
+            await send(message)
+
+        with track_cache_key() as cache_key:
+            await self.app(scope, receive, send_wrapper)
+
+
+async def _request(app: ASGIApp, path: str) -> Optional[int]:
+    """Make GET request to the app in process and get response status."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"cache-warmer")],
+        "client": ("127.0.0.1", 0),
+        "server": ("cache-warmer", 80),
+        "cache_warmer": True,
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def warm_cache(app: ASGIApp, redis: Redis, name: str) -> None:
+    """Replay hot API requests to put fresh responses to cache.
+
+    Hot requests are configured ones and the most requested ones
+    according to access statistics. Warming with the same name is done
+    by the process which takes its lock first, others skip it.
+    """
+    locked = await redis.set(
+        CACHE_WARM_LOCK_KEY.format(name=name), 1,
+        nx=True, ex=settings.CACHE_WARM_LOCK_TTL,
+    )
+    if not locked:
+        logger.info("Cache warming %s is done by another process", name)
+        return
+    paths = list(settings.CACHE_WARM_PATHS)
+    if settings.CACHE_WARM_TOP_N:
+        paths += await AccessStats.get_top(redis, settings.CACHE_WARM_TOP_N)
+    paths = list(dict.fromkeys(paths))
+    semaphore = asyncio.Semaphore(settings.CACHE_WARM_CONCURRENCY)
+
+    async def warm(path: str) -> bool:
+        async with semaphore:
+            try:
+                return await _request(app, path) == 200
+            except Exception:
+                logger.exception("Failed to warm cache for %s", path)
+                return False
+
+    with refresh_cache():
+        results = await asyncio.gather(*(warm(path) for path in paths))
+    logger.info("Cache warmed: %d of %d requests", sum(results), len(paths))
+
+
+async def watch_cache_warming(app: ASGIApp, redis: Redis) -> None:
+    """Flush access statistics and warm cache after every ETL load."""
+    versions = None
+    while True:
+        await asyncio.sleep(settings.CACHE_WARM_CHECK_INTERVAL)
+        try:
+            await access_stats.flush(redis)
+            new_versions = await redis.mget(*ETL_LOADED_KEYS)
+            if versions is not None and new_versions != versions:
+                name = hashlib.md5(
+                    b"|".join(version or b"" for version in new_versions)
+                ).hexdigest()
+                await warm_cache(app, redis, f"etl:{name}")
+            versions = new_versions
+        except Exception:
+            logger.exception("Failed to warm cache")
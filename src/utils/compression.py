@@ -0,0 +1,42 @@
+import gzip
+from typing import Iterable
+
+import brotli
+
+from src.core.config import settings
+
+# Encodings in order of preference when the client accepts several
+ENCODINGS = ("br", "gzip")
+IDENTITY = "identity"
+
+
+def compress_variants(body: bytes) -> dict[str, bytes]:
+    """Compress body with every supported encoding if it's large enough."""
+    if len(body) < settings.CACHE_COMPRESS_MIN_SIZE:
+        return {}
+    return {
+        "br": brotli.compress(body, quality=settings.CACHE_BROTLI_QUALITY),
+        "gzip": gzip.compress(body, compresslevel=settings.CACHE_GZIP_LEVEL),
+    }
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> str:
+    """Choose the preferred encoding of available ones by Accept-Encoding."""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip()] = weight
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = IDENTITY, 0.0
+    for coding in ENCODINGS:
+        weight = weights.get(coding, wildcard)
+        if coding in available and weight > best_weight:
+            best, best_weight = coding, weight
+    return best
@@ -0,0 +1,158 @@
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+
+from src.models.movie import FIELDS_FOR_SEARCH
+from src.utils.utils import TIEBREAKER_SORT
+
+PERSON_ROLES = ("actors", "writers", "directors")
+
+
+def normalize_search_text(text: Optional[str]) -> Optional[str]:
+    """Get canonical form of search text.
+
+    Case and extra whitespace are removed by analyzers anyway, and
+    NFC only composes characters which are the same text. Nothing else
+    is changed, so results stay the same as for the original text.
+    """
+    if text is None:
+        return None
+    text = " ".join(unicodedata.normalize("NFC", text).lower().split())
+    return text or None
+
+
+def normalize_ids(ids: Optional[list[str]]) -> tuple[str, ...]:
+    """Get sorted unique ids."""
+    return tuple(sorted(set(ids or ())))
+
+
+@dataclass(frozen=True)
+class MovieQuery:
+    """Canonical query for movies listing.
+
+    Only full text search affects scoring, all other constraints are
+    put in non-scoring filter context, so ElasticSearch can cache them.
+    Equal parameters always produce equal query bodies.
+    """
+
+    search: Optional[str] = None
+    genres: tuple[str, ...] = ()
+    person_id: Optional[str] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    sort: Optional[str] = None
+
+    @classmethod
+    def create(
+            cls,
+            search: Optional[str] = None,
+            genres: Optional[list[str]] = None,
+            person_id: Optional[str] = None,
+            min_rating: Optional[float] = None,
+            max_rating: Optional[float] = None,
+            sort: Optional[str] = None,
+    ) -> 'MovieQuery':
+        """Build query from raw request parameters."""
+        return cls(
+            search=normalize_search_text(search),
+            genres=normalize_ids(genres),
+            person_id=person_id,
+            min_rating=min_rating,
+            max_rating=max_rating,
+            sort=sort,
+        )
+
+    def get_query(self) -> dict:
+        """Get `query` clause for ElasticSearch."""
+        filters = self._get_filters()
+        if not self.search and not filters:
+            return {"match_all": {}}
+        query = {}
+        if self.search:
+            query["must"] = {
+                "multi_match": {
+                    "query": self.search, "fields": FIELDS_FOR_SEARCH
+                }
+            }
+        if filters:
+            query["filter"] = filters
+        return {"bool": query}
+
+    def get_sort(self) -> list:
+        """Get stable `sort` clause for ElasticSearch."""
+        if self.search:
+            return [{"_score": {"order": "desc"}}, TIEBREAKER_SORT]
+        if self.sort:
+            order = "desc" if self.sort.startswith("-") else "asc"
+            return [
+                {self.sort.lstrip("-"): {"order": order}}, TIEBREAKER_SORT
+            ]
+        return [TIEBREAKER_SORT]
+
+    def get_body(self, size: int, fields: Optional[list[str]] = None) -> dict:
+        """Get body of search request for page of movies.
+
+        Total is not counted, since the API never returns it,
+        so shards may skip counting all matching documents.
+        """
+        body = {
+            "size": size,
+            "query": self.get_query(),
+            "sort": self.get_sort(),
+            "track_total_hits": False,
+        }
+        if fields is not None:
+            body["_source"] = fields
+        return body
+
+    def get_aggregations_body(self, aggregations: dict) -> dict:
+        """Get body of search request for aggregations only."""
+        return {"size": 0, "query": self.get_query(), "aggs": aggregations}
+
+    def _get_filters(self) -> list[dict]:
+        """Get non-scoring constraints of query."""
+        filters = []
+        if self.genres:
+            filters.append(
+                {
+                    "nested": {
+                        "path": "genres",
+                        "query": {"terms": {"genres.id": list(self.genres)}},
+                    }
+                }
+            )
+        if self.person_id:
+            filters.append(
+                {
+                    "bool": {
+                        "should": [
+                            {
+                                "nested": {
+                                    "path": role,
+                                    "query": {
+                                        "term": {f"{role}.id": self.person_id}
+                                    },
+                                }
+                            }
+                            for role in PERSON_ROLES
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                }
+            )
+        if self.min_rating is not None or self.max_rating is not None:
+            rating_range = {}
+            if self.min_rating is not None:
+                rating_range["gte"] = self.min_rating
+            if self.max_rating is not None:
+                rating_range["lte"] = self.max_rating
+            filters.append({"range": {"imdb_rating": rating_range}})
+        return filters
+
+
+def is_request_cacheable(body: dict) -> bool:
+    """Check whether search may use ElasticSearch shard request cache.
+
+    The cache is meant for size-0 requests, i.e. counts and aggregations.
+    """
+    return body.get("size") == 0
@@ -1,44 +1,99 @@
+import base64
+import binascii
+import hashlib
 from operator import itemgetter
-from typing import Optional, Type, Union
+from typing import Optional, Type
 
+import orjson
 from pydantic import parse_obj_as
 
-from src.models.movie import FIELDS_FOR_SEARCH, Movie, Person
+from src.core.config import settings
+from src.models.base import Base
 
+TIEBREAKER_SORT = {"id": {"order": "asc"}}
+# The cheapest sort to walk through all documents inside a point in time
+EXPORT_SORT = ["_shard_doc"]
 
-def get_movies_sorting_for_elastic(sort_field: str) -> dict:
-    return {
-        "sort": {
-            "imdb_rating": {
-                "order": "asc" if sort_field == "imdb_rating" else "desc"
-            }
-        }
-    }
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CURSOR_DESCRIPTION = (
+    "Opaque cursor for deep pagination. Pass an empty value to start "
+    f"and then the value of `{NEXT_CURSOR_HEADER}` response header "
+    "to get the next page. `page` is ignored in this mode. A cursor is "
+    "valid only for the same query and expires without use, then 410 is "
+    "returned and pagination has to start over."
+)
 
 
-def get_genres_filter_for_elastic(genres: list[str]) -> dict:
-    should = [{"match": {"genres.id": genre} for genre in genres}]
-    return {
-        "query": {
-            "nested": {"path": "genres", "query": {"bool": {"should": should}}}
-        }
-    }
+class CursorExpired(ValueError):
+    """Point in time of the cursor is expired or closed."""
 
 
-def get_search_body_for_movies(
-    query: str, fields_for_search: Optional[list[str]] = None
-) -> dict:
-    if fields_for_search is None:
-        fields_for_search = FIELDS_FOR_SEARCH
-    return {
-        "query": {"multi_match": {"query": query, "fields": fields_for_search}}
-    }
+def get_query_hash(body: dict) -> str:
+    """Get hash of query and sort of search body to bind cursors to them."""
+    return hashlib.md5(orjson.dumps(
+        {"query": body.get("query"), "sort": body.get("sort")},
+        option=orjson.OPT_SORT_KEYS,
+    )).hexdigest()
 
 
-def parse_objects(doc: dict, schema: Type[Union[Movie, Person]]) -> list:
+def encode_cursor(pit_id: str, search_after: list, query_hash: str) -> str:
+    """Pack point in time id, sort values of last hit and hash of query
+    to opaque cursor."""
+    raw = orjson.dumps(
+        {"pit": pit_id, "after": search_after, "query": query_hash}
+    )
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(
+        cursor: str, query_hash: str
+) -> tuple[Optional[str], Optional[list]]:
+    """Unpack opaque cursor to point in time id and `search_after` values.
+
+    Raises ValueError for a malformed cursor or a cursor of another query.
+    """
+    if not cursor:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = orjson.loads(raw)
+        pit_id, search_after = data["pit"], data["after"]
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError):
+        raise ValueError("invalid cursor") from None
+    if data.get("query") != query_hash:
+        raise ValueError("cursor of another query")
+    return pit_id, search_after
+
+
+def parse_object(source: dict, schema: Type[Base]) -> dict:
+    """Get document shaped by `schema` from ElasticSearch `_source`.
+
+    Documents of our own indices are already shaped by ETL and passed
+    through as is, otherwise they are validated with `schema` first.
+    """
+    if settings.ELASTIC_TRUSTED_SOURCE:
+        return source
+    return schema.parse_obj(source).dict(exclude_unset=True)
+
+
+def parse_objects(doc: dict, schema: Type[Base]) -> list[dict]:
     if doc and doc.get("hits"):
-        return parse_obj_as(
-            list[schema],
-            list(map(itemgetter("_source"), doc["hits"].get("hits", [])))
+        sources = list(
+            map(itemgetter("_source"), doc["hits"].get("hits", []))
         )
+        if settings.ELASTIC_TRUSTED_SOURCE:
+            return sources
+        return [
+            obj.dict(exclude_unset=True)
+            for obj in parse_obj_as(list[schema], sources)
+        ]
     return []
+
+
+def hits_to_ndjson(hits: list[dict], schema: Type[Base]) -> bytes:
+    """Get documents of ElasticSearch hits as newline delimited JSON."""
+    return b"".join(
+        orjson.dumps(parse_object(hit["_source"], schema)) + b"\n"
+        for hit in hits
+    )
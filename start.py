@@ -1,13 +1,43 @@
-import uvicorn
+import argparse
 import logging
+
+import uvicorn
+
 from src.core.logger import LOGGING
 
-if __name__ == '__main__':
-    uvicorn.run(
-        'src.main:app',
-        host="0.0.0.0",
-        port=8000,
-        log_config=LOGGING,
-        log_level=logging.DEBUG,
-        access_log=False
+APP = 'src.main:app'
+HOST = "0.0.0.0"
+PORT = 8000
+
+
+def parse() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run movies API server")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="run several workers with production settings",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of workers in production, available cores by default",
     )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse()
+    if args.production:
+        from src.core.server import ProductionServer, clear_metrics_dir
+
+        clear_metrics_dir()
+        ProductionServer(APP, HOST, PORT, workers=args.workers).run()
+    else:
+        uvicorn.run(
+            APP,
+            host=HOST,
+            port=PORT,
+            log_config=LOGGING,
+            log_level=logging.DEBUG,
+            access_log=False
+        )